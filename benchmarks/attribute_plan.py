@@ -0,0 +1,68 @@
+# Compares the cost of creating doubles through the cached attribute plan against the original path, which
+# enumerated the attributes of every new instance with inspect.getmembers, and against shadowed and lazy doubles.
+#
+# Usage:
+#     $ python benchmarks/attribute_plan.py [width] [repetitions]
+
+from __future__ import print_function
+
+# Standard modules
+import inspect
+import sys
+import timeit
+
+# External modules
+
+# Internal modules
+import doppelganger
+
+
+
+def make_wide_class(width):
+    dct = {}
+    for j in range(width):
+        dct['method_%d' % j] = lambda self: None
+        dct['member_%d' % j] = j
+    
+    return type('WideClass', (object,), dct)
+
+
+def make_fake_class(true_class):
+    return doppelganger.Doppel('Fake' + true_class.__name__, (true_class,), {})
+
+
+def create_double_through_getmembers(fake_class):
+    self_instance = type.__call__(fake_class)
+    attribute_names = dict(inspect.getmembers(self_instance)).keys()
+    fake_class.clear_attributes(self_instance, [name for name in attribute_names if not fake_class.is_untouchable_attribute(name)])
+    return self_instance
+
+
+def instance_dictionary_size(obj):
+    return sys.getsizeof(obj.__dict__) if obj.__dict__ else 0
+
+
+def main(width = 100, repetitions = 1000):
+    true_class = make_wide_class(width)
+    legacy_fake_class = make_fake_class(true_class)
+    fake_class = make_fake_class(true_class)
+    shadowed_fake_class = make_fake_class(true_class)
+    shadowed_fake_class.declare_shadowed()
+    lazy_fake_class = make_fake_class(true_class)
+    lazy_fake_class.declare_lazy()
+    
+    legacy_time = timeit.timeit(lambda: create_double_through_getmembers(legacy_fake_class), number = repetitions)
+    plan_time = timeit.timeit(fake_class, number = repetitions)
+    shadow_time = timeit.timeit(shadowed_fake_class, number = repetitions)
+    lazy_time = timeit.timeit(lazy_fake_class, number = repetitions)
+    
+    print('class width:            %d members' % (2*width))
+    print('inspect.getmembers:     %.2f us per double' % (1e6*legacy_time/repetitions))
+    print('cached attribute plan:  %.2f us per double, %d byte __dict__' % (1e6*plan_time/repetitions, instance_dictionary_size(fake_class())))
+    print('shadowed:               %.2f us per double, %d byte __dict__' % (1e6*shadow_time/repetitions, instance_dictionary_size(shadowed_fake_class())))
+    print('lazy:                   %.2f us per double' % (1e6*lazy_time/repetitions))
+    print('speedup:                %.1fx (plan), %.1fx (shadowed), %.1fx (lazy)' % (legacy_time/plan_time, legacy_time/shadow_time, legacy_time/lazy_time))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,77 @@
+# Measures the time it takes to import doppelganger in a fresh interpreter, and the time it takes to then look up
+# Doppel, which loads the modules needed to create doubles. Each is measured in its own subprocess, so that nothing is
+# already imported, and the best of several runs is reported. The script exits with status 1 if importing the package
+# takes longer than the budget, in milliseconds, or if it imports any of its submodules, which are only loaded on
+# demand.
+#
+# Usage:
+#     $ python benchmarks/startup.py [--budget 5] [--repeat 20]
+
+from __future__ import print_function
+
+# Standard modules
+import argparse
+import subprocess
+import sys
+
+# External modules
+
+# Internal modules
+
+
+
+measurements = (
+    ('import doppelganger', 'import doppelganger'),
+    ('doppelganger.Doppel', 'import doppelganger; doppelganger.Doppel')
+)
+
+default_budget = 5.0
+
+measurement_template = 'import timeit; start = timeit.default_timer(); %s; print(timeit.default_timer() - start)'
+
+# Prints the submodules of the package which were imported along with it. Python 2 also lists the modules imported by
+# the package, such as sys, under its name, set to None.
+deferred_modules_statement = (
+    'import sys, doppelganger; '
+    'print(" ".join(sorted(name for name, module in sys.modules.items() '
+    'if name.startswith("doppelganger.") and module is not None)))'
+)
+
+
+def measure(statement, repeat):
+    command = [sys.executable, '-c', measurement_template % statement]
+    return min(float(subprocess.check_output(command)) for repetition in range(repeat))
+
+
+def find_deferred_modules():
+    command = [sys.executable, '-c', deferred_modules_statement]
+    return subprocess.check_output(command).decode().split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Measure the time it takes to import doppelganger.')
+    parser.add_argument('--budget', type = float, default = default_budget, help = 'milliseconds allowed for importing the package')
+    parser.add_argument('--repeat', type = int, default = 20)
+    arguments = parser.parse_args()
+    
+    results = dict((name, measure(statement, arguments.repeat)) for name, statement in measurements)
+    for name, statement in measurements:
+        print('%-24s %8.3f ms' % (name, 1e3*results[name]))
+    
+    status = 0
+    
+    import_time = 1e3*results['import doppelganger']
+    if import_time > arguments.budget:
+        print('Importing doppelganger took %.3f ms, over the budget of %.3f ms.' % (import_time, arguments.budget))
+        status = 1
+    
+    deferred_modules = find_deferred_modules()
+    if deferred_modules:
+        print('Importing doppelganger imported %s, which should be imported on demand.' % ', '.join(deferred_modules))
+        status = 1
+    
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,317 @@
+# Benchmarks for the hot paths of doppelganger: creating doubles, patching them and calling patched fakes.
+#
+# Each benchmark reports the best time per operation, in seconds, over several repetitions. Results are printed as a
+# table and can be written to a JSON file. When a baseline file exists, the results are compared against it and the
+# script exits with status 1 if any benchmark is slower than its baseline by more than the tolerance.
+#
+# Usage:
+#     $ python benchmarks/suite.py [--output results.json] [--baseline benchmarks/baseline.json] [--save-baseline]
+#                                  [--tolerance 0.25] [--filter substring]
+
+from __future__ import print_function
+
+# Standard modules
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+# External modules
+
+# Internal modules
+import doppelganger
+
+
+
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+benchmarks = []
+
+
+def benchmark(name, number = 1000):
+    def register(make_operation):
+        benchmarks.append((name, number, make_operation))
+        return make_operation
+    
+    return register
+
+
+def make_class(width = 10, depth = 1):
+    cls = object
+    for level in range(depth):
+        dct = {}
+        for j in range(width):
+            dct['method_%d_%d' % (level, j)] = lambda self: None
+            dct['member_%d_%d' % (level, j)] = j
+        
+        cls = type('Level%d' % level, (cls,), dct)
+    
+    return cls
+
+
+def make_fake_class(true_class, untouchable = ()):
+    fake_class = doppelganger.Doppel('Fake' + true_class.__name__, (true_class,), {})
+    for attribute_name in untouchable:
+        fake_class.declare_untouchable(attribute_name)
+    
+    return fake_class
+
+
+
+# DOUBLE CREATION
+
+def register_width_benchmark(width):
+    @benchmark('doppel_call/width=%d' % width, number = 200)
+    def make_operation():
+        return make_fake_class(make_class(width = width))
+
+
+def register_depth_benchmark(depth):
+    @benchmark('doppel_call/mro_depth=%d' % depth, number = 200)
+    def make_operation():
+        return make_fake_class(make_class(depth = depth))
+
+
+def register_untouchable_benchmark(untouchable_count):
+    @benchmark('doppel_call/untouchable=%d' % untouchable_count, number = 200)
+    def make_operation():
+        true_class = make_class(width = 100)
+        untouchable = ['member_0_%d' % j for j in range(untouchable_count)]
+        return make_fake_class(true_class, untouchable)
+
+
+for width in (10, 100, 1000):
+    register_width_benchmark(width)
+
+for depth in (1, 5, 20):
+    register_depth_benchmark(depth)
+
+for untouchable_count in (0, 10, 100):
+    register_untouchable_benchmark(untouchable_count)
+
+
+@benchmark('doppel_call/shadowed/width=1000', number = 1000)
+def make_operation():
+    fake_class = make_fake_class(make_class(width = 1000))
+    fake_class.declare_shadowed()
+    return fake_class
+
+
+@benchmark('doppel_call/lazy/width=1000', number = 1000)
+def make_operation():
+    fake_class = make_fake_class(make_class(width = 1000))
+    fake_class.declare_lazy()
+    return fake_class
+
+
+
+# PATCHING
+
+@benchmark('tools/monkey_patch', number = 10000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    fake_method = lambda self: None
+    return lambda: doppelganger.tools.monkey_patch(fake_object, 'method_0_0', fake_method)
+
+
+@benchmark('tools/patch_returner', number = 10000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    return lambda: doppelganger.tools.patch_returner(fake_object, 'method_0_0', 0)
+
+
+@benchmark('tools/patch_caller', number = 10000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    function_to_call = lambda: None
+    return lambda: doppelganger.tools.patch_caller(fake_object, 'method_0_0', function_to_call)
+
+
+
+@benchmark('tools/patch_many/methods=10', number = 10000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    fakes = dict(('method_0_%d' % j, j) for j in range(10))
+    return lambda: doppelganger.tools.patch_many(fake_object, fakes)
+
+
+@benchmark('doppel_call/patch_class/methods=10', number = 1000)
+def make_operation():
+    fake_class = make_fake_class(make_class(width = 100))
+    doppelganger.tools.patch_class_many(fake_class, dict(('method_0_%d' % j, j) for j in range(10)))
+    return fake_class
+
+
+
+# CALLING PATCHED FAKES
+
+@benchmark('call/plain_function', number = 100000)
+def make_operation():
+    return lambda: 0
+
+
+@benchmark('call/patched_returner', number = 100000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    doppelganger.tools.patch_returner(fake_object, 'method_0_0', 0)
+    return fake_object.method_0_0
+
+
+@benchmark('call/patched_caller', number = 100000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    doppelganger.tools.patch_caller(fake_object, 'method_0_0', lambda: 0)
+    return fake_object.method_0_0
+
+
+@benchmark('call/recorded_returner', number = 100000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    doppelganger.tools.patch_returner(fake_object, 'method_0_0', 0, doppelganger.CallRecorder())
+    return fake_object.method_0_0
+
+
+@benchmark('call/strict_returner', number = 100000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    doppelganger.tools.patch_returner(fake_object, 'method_0_0', 0, strict = True)
+    return fake_object.method_0_0
+
+
+@benchmark('call/dispatcher/keys=10000', number = 100000)
+def make_operation():
+    fake_object = make_fake_class(make_class())()
+    doppelganger.tools.patch_dispatcher(fake_object, 'method_0_0', dict(((j,), j) for j in range(10000)))
+    return lambda: fake_object.method_0_0(5000)
+
+
+# VERIFYING
+
+# The bulk verification of the verification module is compared against the loop over the recorders which it replaces.
+def make_recorded_fakes(count):
+    fake_class = make_fake_class(make_class())
+    fake_objects = [fake_class() for j in range(count)]
+    for fake_object in fake_objects:
+        doppelganger.tools.patch_returner(fake_object, 'method_0_0', 0, doppelganger.CallRecorder(capacity = 4))
+        fake_object.method_0_0('lol')
+    
+    return fake_objects
+
+
+@benchmark('verification/gather_calls/doubles=10000', number = 10)
+def make_operation():
+    fake_objects = make_recorded_fakes(10000)
+    return lambda: doppelganger.gather_calls(fake_objects, 'method_0_0').all_called_exactly(1, 'lol')
+
+
+@benchmark('verification/all_called_exactly_loop/doubles=10000', number = 10)
+def make_operation():
+    fake_objects = make_recorded_fakes(10000)
+    
+    def operation():
+        for fake_object in fake_objects:
+            recorder = fake_object.method_0_0.recorder
+            if recorder.call_count != 1 or len(recorder.calls_matching('lol')) != 1:
+                return False
+        
+        return True
+    
+    return operation
+
+
+# Arguments are gathered by the first question about them, so later questions only cost counting.
+@benchmark('verification/count_matching_again/doubles=10000', number = 10)
+def make_operation():
+    call_table = doppelganger.gather_calls(make_recorded_fakes(10000), 'method_0_0')
+    call_table.count_matching('lol')
+    return lambda: call_table.count_matching('lol')
+
+
+@benchmark('verification/uncalled/doubles=10000', number = 10)
+def make_operation():
+    fake_objects = make_recorded_fakes(10000)
+    return lambda: doppelganger.gather_calls(fake_objects, 'method_0_0').uncalled()
+
+
+@benchmark('verification/uncalled_loop/doubles=10000', number = 10)
+def make_operation():
+    fake_objects = make_recorded_fakes(10000)
+    return lambda: [fake_object for fake_object in fake_objects if fake_object.method_0_0.recorder.call_count == 0]
+
+
+
+
+def run(name_filter = None, repeat = 5):
+    results = {}
+    for name, number, make_operation in benchmarks:
+        if name_filter and name_filter not in name:
+            continue
+        
+        operation = make_operation()
+        operation()
+        results[name] = min(timeit.repeat(operation, number = number, repeat = repeat))/number
+    
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name in sorted(results):
+        current = results[name]
+        previous = baseline.get(name)
+        if previous:
+            ratio = current/previous
+            flag = 'REGRESSION' if ratio > 1 + tolerance else ''
+            if flag:
+                regressions.append(name)
+            print('%-36s %12.3f us %12.3f us %7.2fx %s' % (name, 1e6*current, 1e6*previous, ratio, flag))
+        else:
+            print('%-36s %12.3f us %15s' % (name, 1e6*current, 'no baseline'))
+    
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the hot paths of doppelganger.')
+    parser.add_argument('--output', help = 'file to which the results are written as JSON')
+    parser.add_argument('--baseline', default = default_baseline_path, help = 'JSON results to compare against')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'write the results to the baseline file')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'allowed relative slowdown (default 0.25)')
+    parser.add_argument('--filter', help = 'only run the benchmarks whose name contains this string')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'repetitions of each benchmark (default 5)')
+    arguments = parser.parse_args(argv)
+    
+    results = run(arguments.filter, arguments.repeat)
+    document = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seconds_per_operation': results
+    }
+    
+    baseline = {}
+    if os.path.exists(arguments.baseline) and not arguments.save_baseline:
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['seconds_per_operation']
+    
+    print('%-36s %15s %15s %8s' % ('benchmark', 'current', 'baseline', 'ratio'))
+    regressions = compare(results, baseline, arguments.tolerance)
+    
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(document, output_file, indent = 2, sort_keys = True)
+    
+    if arguments.save_baseline:
+        with open(arguments.baseline, 'w') as baseline_file:
+            json.dump(document, baseline_file, indent = 2, sort_keys = True)
+    
+    if regressions:
+        print('\n%d benchmark(s) regressed by more than %d%%.' % (len(regressions), 100*arguments.tolerance))
+        return 1
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
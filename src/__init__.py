@@ -1,2 +1,78 @@
-from metaclass import Doppel
-import tools
\ No newline at end of file
+# The package is loaded lazily: a submodule is only imported the first time one of its names is looked up on the
+# package, so that importing doppelganger costs almost nothing. Python 3.7 and later call the module level __getattr__
+# below. Earlier versions, which do not, find the package replaced in sys.modules by a LazyPackage, which does.
+
+# Standard modules
+import sys
+
+# External modules
+
+# Internal modules
+
+
+
+# The names exported by the package, and the submodules they are imported from.
+exported_names = {
+    'Doppel': 'metaclass',
+    'doppel_of': 'factory',
+    'CallRecorder': 'recording',
+    'take_snapshot': 'snapshot',
+    'DoublePool': 'snapshot',
+    'record_cassette': 'cassette',
+    'replay_cassette': 'cassette',
+    'gather_calls': 'verification',
+    'doppel_module': 'namespace'
+}
+
+# The submodules which can be looked up on the package, and those among them which are listed by dir.
+submodule_names = frozenset([
+    'asynchronous', 'cassette', 'declarations', 'deep', 'dispatch', 'enumeration', 'factory', 'instrumentation', 'lazy',
+    'metaclass', 'namespace', 'pickling', 'recording', 'registry', 'signatures', 'snapshot', 'streaming', 'tools',
+    'verification'
+])
+
+public_submodule_names = ('enumeration', 'instrumentation', 'registry', 'signatures', 'streaming', 'tools')
+
+
+
+def __getattr__(name):
+    import importlib
+    
+    module_name = exported_names.get(name)
+    if module_name is not None:
+        value = getattr(importlib.import_module('.' + module_name, __name__), name)
+    elif name in submodule_names:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(exported_names) | set(public_submodule_names))
+
+
+
+if sys.version_info < (3, 7):
+    import types
+    
+    # A LazyPackage keeps the names looked up through __getattr__ in its own __dict__. It holds on to the module it
+    # replaces, whose globals the functions of the package keep using, and which Python 2 would otherwise clear.
+    class LazyPackage(types.ModuleType):
+        
+        def __getattr__(self, name):
+            value = __getattr__(name)
+            setattr(self, name, value)
+            return value
+        
+        
+        def __dir__(self):
+            return __dir__()
+    
+    
+    lazy_package = LazyPackage(__name__)
+    lazy_package.__dict__.update(globals())
+    lazy_package.replaced_module = sys.modules[__name__]
+    sys.modules[__name__] = lazy_package
\ No newline at end of file
@@ -0,0 +1,63 @@
+# Coroutine versions of the fakes in tools. This module requires Python 3.5 or later, and is only imported by tools when
+# a coroutine fake is actually needed.
+
+# Standard modules
+import asyncio
+import inspect
+
+# External modules
+
+# Internal modules
+
+
+
+# If latency is given, the fake awaits asyncio.sleep(latency) before returning, which simulates the latency of the
+# real method while letting the event loop run other doubles in the meantime. If a signature checker is given, the
+# arguments are checked as soon as the coroutine starts.
+def create_fake_coroutine_returner(fake_returner_return_value, recorder = None, latency = None, signature_checker = None):
+    record = recorder.record if recorder is not None else None
+    check = signature_checker.check if signature_checker is not None else None
+    
+    async def fake_returner(self, *method_args, **method_kwargs):
+        if check is not None:
+            check(self, *method_args, **method_kwargs)
+        
+        if record is not None:
+            record(method_args, method_kwargs)
+        
+        if latency:
+            await asyncio.sleep(latency)
+        
+        return fake_returner_return_value
+    
+    if recorder is not None:
+        fake_returner.recorder = recorder
+    
+    return fake_returner
+
+
+# function_to_call may be a plain function or a coroutine function. Its result is awaited if it is awaitable.
+def create_fake_coroutine_caller(function_to_call, recorder = None, latency = None, signature_checker = None):
+    record = recorder.record if recorder is not None else None
+    check = signature_checker.check if signature_checker is not None else None
+    
+    async def fake_caller(self, *method_args, **method_kwargs):
+        if check is not None:
+            check(self, *method_args, **method_kwargs)
+        
+        if record is not None:
+            record(method_args, method_kwargs)
+        
+        if latency:
+            await asyncio.sleep(latency)
+        
+        result = function_to_call(*method_args, **method_kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        
+        return result
+    
+    if recorder is not None:
+        fake_caller.recorder = recorder
+    
+    return fake_caller
\ No newline at end of file
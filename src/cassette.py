@@ -0,0 +1,215 @@
+# Standard modules
+import mmap
+import pickle
+import struct
+import threading
+
+# External modules
+
+# Internal modules
+from .factory import doppel_of
+from .metaclass import Doppel
+from . import tools
+
+
+
+# A cassette starts with a header, followed by one record per call and then by an index. Each record holds the lengths
+# of its key and outcome, then the key, the pickled arguments of the call, and the outcome, the pickled return value or
+# exception. The index maps each method name to the keys of its calls, and each key to the positions of its outcomes,
+# in the order they were recorded. The file ends with the position of the index, so that replaying a cassette only reads
+# the index up front, and every outcome is read from the memory mapped file when its call is first replayed.
+magic = b'DPLC'
+version = 1
+header_format = struct.Struct('<4sB')
+record_format = struct.Struct('<II')
+footer_format = struct.Struct('<Q')
+pickle_protocol = 2
+
+
+
+class CassetteWriter(object):
+    
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(header_format.pack(magic, version))
+        self.index = {}
+        self.lock = threading.Lock()
+    
+    
+    def write(self, name, method_args, method_kwargs, raised, result):
+        key = create_key(method_args, method_kwargs)
+        outcome = pickle.dumps((raised, result), pickle_protocol)
+        
+        with self.lock:
+            position = self.file.tell() + record_format.size + len(key)
+            self.file.write(record_format.pack(len(key), len(outcome)))
+            self.file.write(key)
+            self.file.write(outcome)
+            self.index.setdefault(name, {}).setdefault(key, []).append((position, len(outcome)))
+    
+    
+    def close(self):
+        with self.lock:
+            index_position = self.file.tell()
+            pickle.dump(self.index, self.file, pickle_protocol)
+            self.file.write(footer_format.pack(index_position))
+            self.file.close()
+
+
+
+class Cassette(object):
+    
+    def __init__(self, path):
+        with open(path, 'rb') as cassette_file:
+            self.map = mmap.mmap(cassette_file.fileno(), 0, access = mmap.ACCESS_READ)
+        
+        if header_format.unpack_from(self.map, 0) != (magic, version):
+            self.map.close()
+            raise ValueError('%s is not a cassette, or was written by another version of doppelganger.' % path)
+        
+        index_position, = footer_format.unpack_from(self.map, len(self.map) - footer_format.size)
+        self.index = pickle.loads(self.map[index_position:len(self.map) - footer_format.size])
+    
+    
+    def method_names(self):
+        return list(self.index)
+    
+    
+    def read_outcome(self, position, length):
+        return pickle.loads(self.map[position:position + length])
+    
+    
+    def close(self):
+        self.map.close()
+
+
+
+# Records the calls made to the methods of the object it wraps. Every other attribute is read from that object as it
+# is, without being recorded.
+class RecordingProxy(object):
+    
+    __slots__ = ('__real_object', '__writer')
+    
+    def __init__(self, real_object, writer):
+        self.__real_object = real_object
+        self.__writer = writer
+    
+    
+    def __getattr__(self, name):
+        attribute = getattr(self.__real_object, name)
+        if not callable(attribute):
+            return attribute
+        
+        writer = self.__writer
+        
+        def record_call(*method_args, **method_kwargs):
+            try:
+                result = attribute(*method_args, **method_kwargs)
+            except Exception as exception:
+                writer.write(name, method_args, method_kwargs, True, exception)
+                raise
+            
+            writer.write(name, method_args, method_kwargs, False, result)
+            return result
+        
+        return record_call
+
+
+
+class Recording(object):
+    
+    def __init__(self, real_object, path):
+        self.writer = CassetteWriter(path)
+        self.proxy = RecordingProxy(real_object, self.writer)
+    
+    
+    def __enter__(self):
+        return self.proxy
+    
+    
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+    
+    
+    def close(self):
+        self.writer.close()
+
+
+
+class Replay(object):
+    
+    def __init__(self, double, cassette):
+        self.double = double
+        self.cassette = cassette
+    
+    
+    def __enter__(self):
+        return self.double
+    
+    
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+    
+    
+    def close(self):
+        self.cassette.close()
+
+
+
+# Replays the outcomes recorded for one method. Calls are matched by their pickled arguments, so they have to be made
+# with arguments which pickle the same as the recorded ones. A call made more often than it was recorded is answered
+# with its last outcome.
+class ReplayedMethod(object):
+    
+    def __init__(self, cassette, name):
+        self.cassette = cassette
+        self.outcomes = cassette.index[name]
+        self.replay_counts = {}
+        self.name = name
+    
+    
+    def __call__(self, *method_args, **method_kwargs):
+        key = create_key(method_args, method_kwargs)
+        outcomes = self.outcomes.get(key)
+        if outcomes is None:
+            raise KeyError('No call to %s with these arguments was recorded: %r, %r' % (self.name, method_args, method_kwargs))
+        
+        replay_count = self.replay_counts.get(key, 0)
+        self.replay_counts[key] = replay_count + 1
+        
+        raised, result = self.cassette.read_outcome(*outcomes[min(replay_count, len(outcomes) - 1)])
+        if raised:
+            raise result
+        
+        return result
+
+
+
+def create_key(method_args, method_kwargs):
+    return pickle.dumps((method_args, sorted(method_kwargs.items())), pickle_protocol)
+
+
+# Records the method calls made through the returned proxy to real_object and the outcome of each, and writes them to
+# the cassette at path. The cassette is complete once the recording is closed, as on leaving a with block.
+def record_cassette(real_object, path):
+    return Recording(real_object, path)
+
+
+# Patches a double so that its methods replay the calls recorded in the cassette at path, and returns a replay whose
+# double attribute holds it. double_or_class is either a double, which is patched, or a class, for which a double is
+# created with doppel_of. That double is created without running the constructor of the class, as the recorded object
+# already has. The cassette stays open until the replay is closed, as on leaving a with block, after which the
+# replayed methods can no longer be called.
+def replay_cassette(path, double_or_class):
+    if not isinstance(double_or_class, type):
+        double = double_or_class
+    elif isinstance(double_or_class, Doppel):
+        double = double_or_class.create_without_constructor()
+    else:
+        double = doppel_of(double_or_class).create_without_constructor()
+    
+    cassette = Cassette(path)
+    for name in cassette.method_names():
+        tools.patch_caller(double, name, ReplayedMethod(cassette, name))
+    
+    return Replay(double, cassette)
\ No newline at end of file
@@ -0,0 +1,91 @@
+# Standard modules
+
+# External modules
+
+# Internal modules
+
+
+
+# Declarations maps attribute names to True if they have been declared untouchable and to False if they have been
+# declared touchable. The declarations of a Doppel class which inherits from another Doppel class are chained to those
+# of its parent: names which have not been declared locally resolve to the parent's declarations, which are not copied.
+class Declarations(object):
+    
+    def __init__(self, parent = None):
+        self.parent = parent
+        self.local = {}
+        self.version = 0
+    
+    
+    def declare(self, attribute_name, untouchable):
+        if self.local.get(attribute_name) is untouchable:
+            return
+        
+        self.local[attribute_name] = untouchable
+        self.version += 1
+    
+    
+    def resolve(self, attribute_name):
+        declarations = self
+        while declarations is not None:
+            untouchable = declarations.local.get(attribute_name)
+            if untouchable is not None:
+                return untouchable
+            
+            declarations = declarations.parent
+        
+        return None
+    
+    
+    # The sum of the versions along the chain increases whenever a declaration is made anywhere along it.
+    def chain_version(self):
+        version = 0
+        declarations = self
+        while declarations is not None:
+            version += declarations.version
+            declarations = declarations.parent
+        
+        return version
+    
+    
+    def resolved_names(self, untouchable):
+        names = set()
+        seen = set()
+        declarations = self
+        while declarations is not None:
+            for attribute_name, declared_untouchable in declarations.local.items():
+                if attribute_name in seen:
+                    continue
+                
+                seen.add(attribute_name)
+                if declared_untouchable is untouchable:
+                    names.add(attribute_name)
+            
+            declarations = declarations.parent
+        
+        return names
+
+
+
+# A read only, set like view of the names which resolve to a given declaration.
+class DeclarationView(object):
+    
+    def __init__(self, declarations, untouchable):
+        self.declarations = declarations
+        self.untouchable = untouchable
+    
+    
+    def __contains__(self, attribute_name):
+        return self.declarations.resolve(attribute_name) is self.untouchable
+    
+    
+    def __iter__(self):
+        return iter(self.declarations.resolved_names(self.untouchable))
+    
+    
+    def __len__(self):
+        return len(self.declarations.resolved_names(self.untouchable))
+    
+    
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, sorted(self))
@@ -0,0 +1,78 @@
+# Standard modules
+import sys
+
+# External modules
+
+# Internal modules
+
+
+
+# Types which annotations commonly name but which are never worth doubling.
+builtin_module_names = frozenset(['builtins', '__builtin__'])
+
+
+
+# A ChildDouble stands in for an attribute of a deep double whose type is known. The first time the attribute is looked
+# up, it creates a double of that type without running its constructor, and caches it in the __dict__ of the parent,
+# where every later lookup finds it directly. Since children are only created on demand, an object graph with cycles is
+# only ever built as far as it is walked.
+class ChildDouble(object):
+    
+    def __init__(self, name, child_class):
+        self.name = name
+        self.child_class = child_class
+    
+    
+    def __get__(self, self_instance, owner):
+        if self_instance is None:
+            return self
+        
+        child = self.child_class.create_without_constructor()
+        try:
+            instance_dictionary = object.__getattribute__(self_instance, '__dict__')
+        except AttributeError:
+            return child
+        
+        return instance_dictionary.setdefault(self.name, child)
+
+
+
+# Returns a dictionary mapping attribute names to the types known for them, from the annotations of the classes in the
+# method resolution order of doppel_class and from the specs declared on it and on its Doppel ancestors. Declared specs
+# take precedence over annotations, and subclasses over their bases. Annotations which are not classes, or which name
+# builtin types, are ignored. Annotations given as strings are looked up in the module of their class.
+def retrieve_attribute_types(doppel_class):
+    attribute_types = {}
+    specs = {}
+    for klass in reversed(doppel_class.__mro__):
+        annotations = klass.__dict__.get('__annotations__')
+        if annotations:
+            module = sys.modules.get(klass.__module__)
+            for name, annotation in annotations.items():
+                if isinstance(annotation, str):
+                    annotation = getattr(module, annotation, None)
+                
+                if isinstance(annotation, type) and annotation.__module__ not in builtin_module_names:
+                    attribute_types[name] = annotation
+                else:
+                    attribute_types.pop(name, None)
+        
+        if isinstance(klass, type(doppel_class)):
+            specs.update(klass.__dict__['__doppel_state__'].specs)
+    
+    attribute_types.update(specs)
+    return attribute_types
+
+
+# Returns a dictionary mapping the names of the attributes of doppel_class whose types are known, and for which decide
+# returns True, to the deep Doppel classes of their types. The Doppel classes come from doppel_of, so every double of a
+# given type in the graph shares one Doppel class, and therefore one attribute plan.
+def create_child_classes(doppel_class, decide):
+    from .factory import doppel_of
+    
+    child_classes = {}
+    for name, attribute_type in retrieve_attribute_types(doppel_class).items():
+        if decide(name):
+            child_classes[name] = doppel_of(attribute_type, deep = True)
+    
+    return child_classes
\ No newline at end of file
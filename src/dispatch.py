@@ -0,0 +1,71 @@
+# Standard modules
+
+# External modules
+
+# Internal modules
+
+
+
+# Stands in for a missing default, since None is a valid default return value.
+class NoDefault(object):
+    pass
+
+
+
+# Wraps a value to be returned by a fake as it is, so that a callable, such as a class or a function, can be returned
+# rather than called.
+class ReturnValue(object):
+    
+    def __init__(self, value):
+        self.value = value
+
+
+
+# A DispatchTable returns the value table maps the arguments of a call to. Without a key function, calls are looked up
+# by the tuple of their positional arguments. With one, they are looked up by whatever key returns when called with the
+# same arguments. The table is copied into a dict, so that every lookup takes constant time whatever mapping or
+# sequence of pairs it was given as. Calls whose key is unhashable, and so cannot be in the table, return the default.
+class DispatchTable(object):
+    
+    def __init__(self, table, default = NoDefault, key = None):
+        self.table = dict(table)
+        self.default = default
+        self.key = key
+    
+    
+    def __call__(self, *method_args, **method_kwargs):
+        if self.key is not None:
+            lookup_key = self.key(*method_args, **method_kwargs)
+        elif method_kwargs:
+            raise TypeError('Calls with keyword arguments can only be dispatched on by a key function.')
+        else:
+            lookup_key = method_args
+        
+        try:
+            return self.table[lookup_key]
+        except (KeyError, TypeError):
+            if self.default is NoDefault:
+                raise
+            
+            return self.default
+
+
+
+# A ReturnSequence returns the next of its values on every call, whatever the arguments. values can be any iterable,
+# including a generator, and is only consumed as calls are made. Once it is exhausted, every call returns default, or
+# raises an IndexError if there is none.
+class ReturnSequence(object):
+    
+    def __init__(self, values, default = NoDefault):
+        self.iterator = iter(values)
+        self.default = default
+    
+    
+    def __call__(self, *method_args, **method_kwargs):
+        for value in self.iterator:
+            return value
+        
+        if self.default is NoDefault:
+            raise IndexError('The sequence of return values is exhausted.')
+        
+        return self.default
\ No newline at end of file
@@ -0,0 +1,119 @@
+# Standard modules
+import types
+import weakref
+
+# External modules
+
+# Internal modules
+
+
+
+# Kinds of members. Methods include static and class methods as well as builtin ones. Properties are all the data
+# descriptors written in Python, whose getters and setters are production code. Slots are the data descriptors
+# implemented by the interpreter, such as those created by __slots__, which store values without running any code.
+# Anything else is data.
+METHOD = 'method'
+PROPERTY = 'property'
+DATA = 'data'
+SLOT = 'slot'
+
+slot_types = (types.MemberDescriptorType, types.GetSetDescriptorType)
+routine_types = (types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+# The members of every class enumerated so far, along with the fingerprint of the kinds of its members when they were
+# enumerated. The cached dictionaries only hold names and kinds, so they never keep a class alive.
+class_members_cache = weakref.WeakKeyDictionary()
+
+# Py_TPFLAGS_HEAPTYPE. Classes without it, builtin and extension types, can never be modified, so fingerprints leave
+# them out. Classic classes have no flags, and are always included.
+heap_type_flag = 1 << 9
+
+
+
+# Returns a dictionary mapping the name of every attribute defined by cls or by a class in its method resolution order
+# to its kind. Members are read from the __dict__ of each class and classified by their type alone, so that no getter,
+# lazy loader or __getattr__ hook ever runs. The members of a class are cached until a class in its method resolution
+# order gains or loses an attribute, or replaces one with a value of another type. A class with a single base reuses the
+# cached members of that base, so a hierarchy of classes is only enumerated once, however many of its classes are
+# doubled. The returned dictionary is a copy.
+def enumerate_class_members(cls):
+    return dict(retrieve_class_members(cls))
+
+
+def retrieve_class_members(cls):
+    fingerprint = fingerprint_class_kinds(cls)
+    try:
+        cached_fingerprint, members = class_members_cache[cls]
+    except (KeyError, TypeError):
+        pass
+    else:
+        if cached_fingerprint == fingerprint:
+            return members
+    
+    if len(cls.__bases__) == 1 and cls.__mro__[1:] == cls.__bases__[0].__mro__:
+        members = dict(retrieve_class_members(cls.__bases__[0]))
+        members.update((name, classify(value)) for name, value in cls.__dict__.items())
+    else:
+        members = {}
+        for klass in cls.__mro__:
+            for name, value in klass.__dict__.items():
+                if name not in members:
+                    members[name] = classify(value)
+    
+    try:
+        class_members_cache[cls] = (fingerprint, members)
+    except TypeError:
+        pass
+    
+    return members
+
+
+# Returns a cheap signature of the attributes defined by cls and by the classes in its method resolution order: the
+# number of attributes each of them defines. The signature changes whenever an attribute is added or removed, but not
+# when one is replaced in place, and it neither keeps nor compares any value.
+def sign_class(cls):
+    return [len(klass.__dict__) for klass in cls.__mro__ if getattr(klass, '__flags__', heap_type_flag) & heap_type_flag]
+
+
+# Returns what the kinds of the members of cls depend on: the names defined by each class in its method resolution
+# order, and the identities of the types of their values. It keeps no value alive.
+def fingerprint_class_kinds(cls):
+    fingerprint = []
+    for klass in cls.__mro__:
+        if getattr(klass, '__flags__', heap_type_flag) & heap_type_flag:
+            dictionary = klass.__dict__
+            fingerprint.append(list(dictionary))
+            fingerprint.append([id(type(value)) for value in dictionary.values()])
+    
+    return fingerprint
+
+
+# Returns the members of the class of obj, along with the attributes in the __dict__ of obj, which are data unless a
+# property of the same name takes precedence over them.
+def enumerate_members(obj):
+    members = enumerate_class_members(type(obj))
+    try:
+        instance_dictionary = object.__getattribute__(obj, '__dict__')
+    except AttributeError:
+        return members
+    
+    for name in instance_dictionary:
+        if members.get(name) != PROPERTY:
+            members[name] = DATA
+    
+    return members
+
+
+def classify(value):
+    value_type = type(value)
+    if value_type in slot_types:
+        return SLOT
+    
+    if hasattr(value_type, '__set__') or hasattr(value_type, '__delete__'):
+        return PROPERTY
+    
+    # Like inspect.isroutine, which would import inspect, any other non-data descriptor which is not a class is a method.
+    if isinstance(value, routine_types) or (hasattr(value_type, '__get__') and not isinstance(value, type)):
+        return METHOD
+    
+    return DATA
\ No newline at end of file
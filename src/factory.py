@@ -0,0 +1,48 @@
+# Standard modules
+import weakref
+
+# External modules
+
+# Internal modules
+from .metaclass import Doppel
+
+
+
+# Doppel classes created by doppel_of, keyed weakly by the class they double, then by their declarations, and held
+# through weak references, since a Doppel class references the class it doubles as its base. Nothing is stored on the
+# doubled class itself, and the cache never keeps it alive. A Doppel class collected once no caller holds it any longer
+# is created anew by the next call.
+doppel_classes = weakref.WeakKeyDictionary()
+
+
+
+# Returns a Doppel class for cls on which the given attributes have been declared untouchable and touchable. Repeated
+# calls with the same class and the same declarations return the same Doppel class while it is alive, so any
+# declarations made on it afterwards are shared by every caller holding it. If deep is True, the Doppel class is
+# declared deep, and is cached apart from the ones which are not.
+def doppel_of(cls, untouchable = (), touchable = (), deep = False):
+    declaration_key = (frozenset(untouchable), frozenset(touchable), deep)
+    cache = doppel_classes.get(cls)
+    if cache is None:
+        cache = doppel_classes[cls] = {}
+    
+    doppel_class_reference = cache.get(declaration_key)
+    doppel_class = doppel_class_reference() if doppel_class_reference is not None else None
+    if doppel_class is None:
+        doppel_class = create_doppel_class(cls, untouchable, touchable, deep)
+        cache[declaration_key] = weakref.ref(doppel_class)
+    
+    return doppel_class
+
+
+def create_doppel_class(cls, untouchable = (), touchable = (), deep = False):
+    doppel_class = Doppel(cls.__name__, (cls,), {'__module__': cls.__module__})
+    doppel_class.declare_deep(deep)
+    
+    for attribute_name in untouchable:
+        doppel_class.declare_untouchable(attribute_name)
+    
+    for attribute_name in touchable:
+        doppel_class.declare_touchable(attribute_name)
+    
+    return doppel_class
\ No newline at end of file
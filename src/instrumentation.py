@@ -0,0 +1,199 @@
+# Standard modules
+import array
+import os
+import sys
+import threading
+import timeit
+
+# External modules
+
+# Internal modules
+
+
+
+# Instrumentation is off unless it is enabled, either by calling enable or by setting the DOPPELGANGER_INSTRUMENTATION
+# environment variable to the format of the report to write at exit, 'text' or 'json'. Any other value which does not
+# read as off, such as '1', asks for a text report. The report is written to standard error, or to the file named by
+# DOPPELGANGER_INSTRUMENTATION_PATH.
+enabled = False
+
+timer = timeit.default_timer
+
+# Statistics are keyed by the qualified names of Doppel classes, so that Doppel classes which are created anew in the
+# setUp of every test are reported together, and so that no Doppel class is kept alive by its statistics.
+statistics = {}
+
+report_settings = {'format': None, 'path': None, 'registered': False}
+
+lock = threading.Lock()
+
+
+
+class ClassStatistics(object):
+    
+    def __init__(self, name):
+        self.name = name
+        self.instantiation_count = 0
+        self.construction_times = array.array('d')
+        self.enumeration_time = 0.0
+        self.clearing_time = 0.0
+        self.patch_count = 0
+    
+    
+    def total_construction_time(self):
+        return sum(self.construction_times)
+    
+    
+    # Nearest rank percentile of the construction times, with 0 < fraction <= 1.
+    def construction_time_percentile(self, fraction):
+        if not self.construction_times:
+            return 0.0
+        
+        construction_times = sorted(self.construction_times)
+        rank = max(int(round(fraction*len(construction_times))), 1)
+        return construction_times[rank - 1]
+    
+    
+    def summary(self):
+        return {
+            'name': self.name,
+            'instantiation_count': self.instantiation_count,
+            'total_construction_time': self.total_construction_time(),
+            'p50_construction_time': self.construction_time_percentile(0.5),
+            'p90_construction_time': self.construction_time_percentile(0.9),
+            'p99_construction_time': self.construction_time_percentile(0.99),
+            'enumeration_time': self.enumeration_time,
+            'clearing_time': self.clearing_time,
+            'patch_count': self.patch_count
+        }
+
+
+
+def enable(report_format = None, report_path = None):
+    global enabled
+    enabled = True
+    
+    if report_format is not None:
+        if report_format not in ('text', 'json'):
+            raise ValueError('Unknown report format: %r' % (report_format,))
+        
+        report_settings['format'] = report_format
+        report_settings['path'] = report_path
+        if not report_settings['registered']:
+            import atexit
+            atexit.register(write_report_at_exit)
+            report_settings['registered'] = True
+
+
+# Stops recording. A report requested by enable is still written at exit.
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    statistics.clear()
+
+
+def retrieve_statistics(cls):
+    name = qualified_name(cls)
+    class_statistics = statistics.get(name)
+    if class_statistics is None:
+        class_statistics = statistics[name] = ClassStatistics(name)
+    
+    return class_statistics
+
+
+def qualified_name(cls):
+    return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+
+def measure_construction(doppel_class, construct, *args, **kwargs):
+    start = timer()
+    self_instance = construct(*args, **kwargs)
+    duration = timer() - start
+    
+    with lock:
+        class_statistics = retrieve_statistics(doppel_class)
+        class_statistics.instantiation_count += 1
+        class_statistics.construction_times.append(duration)
+    
+    return self_instance
+
+
+def record_enumeration(doppel_class, duration):
+    with lock:
+        retrieve_statistics(doppel_class).enumeration_time += duration
+
+
+def record_clearing(doppel_class, duration):
+    with lock:
+        retrieve_statistics(doppel_class).clearing_time += duration
+
+
+def record_patch(obj):
+    record_patches(type(obj), 1)
+
+
+def record_patches(cls, patch_count):
+    with lock:
+        retrieve_statistics(cls).patch_count += patch_count
+
+
+
+# Classes are reported in decreasing order of total construction time.
+def summaries():
+    summaries = [class_statistics.summary() for class_statistics in statistics.values()]
+    summaries.sort(key = lambda summary: summary['total_construction_time'], reverse = True)
+    return summaries
+
+
+def report_json():
+    import json
+    return json.dumps(summaries(), indent = 2)
+
+
+def report_text():
+    lines = ['%-48s %8s %12s %10s %10s %14s %10s %8s' % ('class', 'count', 'total (ms)', 'p50 (us)', 'p99 (us)', 'enumerate (ms)', 'clear (ms)', 'patches')]
+    for summary in summaries():
+        lines.append('%-48s %8d %12.3f %10.2f %10.2f %14.3f %10.3f %8d' % (
+            summary['name'],
+            summary['instantiation_count'],
+            1e3*summary['total_construction_time'],
+            1e6*summary['p50_construction_time'],
+            1e6*summary['p99_construction_time'],
+            1e3*summary['enumeration_time'],
+            1e3*summary['clearing_time'],
+            summary['patch_count']))
+    
+    return '\n'.join(lines)
+
+
+def write_report_at_exit():
+    report_format = report_settings['format']
+    if report_format is None:
+        return
+    
+    report = report_json() if report_format == 'json' else report_text()
+    report_path = report_settings['path']
+    if report_path:
+        with open(report_path, 'w') as report_file:
+            report_file.write(report + '\n')
+    else:
+        sys.stderr.write(report + '\n')
+
+
+
+def read_environment_format(value):
+    value = value.strip().lower()
+    if value in ('', '0', 'false', 'no', 'off'):
+        return None
+    
+    return value if value in ('text', 'json') else 'text'
+
+
+
+environment_format = read_environment_format(os.environ.get('DOPPELGANGER_INSTRUMENTATION', ''))
+if environment_format is not None:
+    enable(environment_format, os.environ.get('DOPPELGANGER_INSTRUMENTATION_PATH'))
\ No newline at end of file
@@ -0,0 +1,132 @@
+# Standard modules
+
+# External modules
+
+# Internal modules
+from .pickling import auxiliary_class_name
+
+
+
+# The name under which a lazy double lists the attributes it has resolved, in the order in which they were resolved.
+resolved_attributes_name = '__resolved_attributes__'
+
+
+
+# A LazyResolver builds the lazy class of a Doppel class: a subclass whose __getattribute__ resolves each touchable
+# class attribute the first time it is looked up on a double, caches the resolved value in the __dict__ of the double
+# and records its name. Creating a lazy double therefore never enumerates the attributes of its class. The price is
+# paid on attribute lookups instead, which all go through __getattribute__. Since lookups may happen on any thread, lazy
+# doubles follow the declarations of the class and ignore per thread overrides.
+class LazyResolver(object):
+    
+    def __init__(self, doppel_class):
+        self.doppel_class = doppel_class
+        self.decisions = {}
+        self.version = None
+        self.lazy_class = self.create_lazy_class()
+    
+    
+    # Decisions are forgotten whenever the declarations of the Doppel class or of its Doppel ancestors change. Names which
+    # no class defines are decided again on every lookup, since a class may define them later. Other decisions only
+    # depend on the declarations, whichever values the classes give those names, so lazy doubles never need to
+    # fingerprint the attributes of their classes.
+    def validate(self):
+        version = self.doppel_class.__doppel_state__.declarations.chain_version()
+        if version != self.version:
+            self.decisions.clear()
+            self.version = version
+    
+    
+    # Returns True if and only if the attribute with the given name is to be resolved lazily, which is the case for
+    # every touchable attribute defined on a class in the method resolution order of the Doppel class, and, on deep
+    # Doppel classes, for every touchable attribute which resolves to a child double.
+    def decide(self, name):
+        doppel_class = self.doppel_class
+        if doppel_class.is_declared_untouchable_attribute(name):
+            decision = False
+        elif any(name in klass.__dict__ for klass in doppel_class.__mro__) or doppel_class.retrieve_child_class(name) is not None:
+            decision = True
+        else:
+            return False
+        
+        self.decisions[name] = decision
+        return decision
+    
+    
+    def resolve(self, self_instance, instance_dictionary, name):
+        child_class = self.doppel_class.retrieve_child_class(name)
+        value = child_class.create_without_constructor() if child_class is not None else None
+        instance_dictionary[name] = value
+        
+        resolved_attributes = instance_dictionary.get(resolved_attributes_name)
+        if resolved_attributes is None:
+            resolved_attributes = instance_dictionary[resolved_attributes_name] = []
+        resolved_attributes.append(name)
+        
+        return value
+    
+    
+    def create_lazy_class(self):
+        decisions = self.decisions
+        decide = self.decide
+        resolve = self.resolve
+        object_getattribute = object.__getattribute__
+        
+        def __getattribute__(self_instance, name):
+            instance_dictionary = object_getattribute(self_instance, '__dict__')
+            try:
+                return instance_dictionary[name]
+            except KeyError:
+                pass
+            
+            decision = decisions.get(name)
+            if decision is None:
+                decision = decide(name)
+            
+            if decision:
+                return resolve(self_instance, instance_dictionary, name)
+            
+            return object_getattribute(self_instance, name)
+        
+        doppel_class = self.doppel_class
+        lazy_dictionary = {
+            '__getattribute__': __getattribute__,
+            '__module__': doppel_class.__module__,
+            auxiliary_class_name: True
+        }
+        return type(doppel_class)(doppel_class.__name__, (doppel_class,), lazy_dictionary)
+    
+    
+    # Instance attributes set by the constructor are cleared immediately, since they cannot be told apart from resolved
+    # values later on. There are only ever a few of them. Those which resolve to child doubles are removed instead, so
+    # that they are resolved like class attributes. Names are recorded on the Doppel class under its lock, the first time
+    # they are seen, while other threads may be reading them.
+    def apply(self, self_instance):
+        doppel_class = self.doppel_class
+        state = doppel_class.__doppel_state__
+        instance_dictionary = self_instance.__dict__
+        for name in list(instance_dictionary):
+            if not doppel_class.is_declared_untouchable_attribute(name):
+                if name not in state.instance_attribute_names:
+                    with state.lock:
+                        state.instance_attribute_names.add(name)
+                
+                if doppel_class.retrieve_child_class(name) is None:
+                    instance_dictionary[name] = None
+                else:
+                    del instance_dictionary[name]
+        
+        object.__setattr__(self_instance, '__class__', self.lazy_class)
+    
+    
+    def create_without_constructor(self):
+        lazy_class = self.lazy_class
+        self_instance = lazy_class.__new__(lazy_class)
+        
+        doppel_class = self.doppel_class
+        instance_dictionary = object.__getattribute__(self_instance, '__dict__')
+        for name in tuple(doppel_class.__doppel_state__.instance_attribute_names):
+            if not doppel_class.is_declared_untouchable_attribute(name) and doppel_class.retrieve_child_class(name) is None:
+                instance_dictionary[name] = None
+        
+        return self_instance
\ No newline at end of file
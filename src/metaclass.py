@@ -1,64 +1,525 @@
 # Standard modules
-import inspect
+import contextlib
+import threading
+import weakref
 
 # External modules
 
 # Internal modules
+from . import instrumentation
+from .declarations import Declarations, DeclarationView
+from .enumeration import enumerate_class_members, enumerate_members, sign_class, PROPERTY
+from .pickling import auxiliary_class_name, reduce_double, set_double_state, copy_double, deepcopy_double, register_doppel_metaclass
+
+
+
+# The deep, lazy and registry modules are only imported once a Doppel class uses them, so that looking Doppel up costs
+# as little as possible.
+
+# Shadow and masking classes carry this name in their __dict__, set to their kind, so that doubles can be moved from
+# one to the next when a declaration is propagated to them.
+masking_class_name = '__doppel_masking__'
+
+# Every Doppel class holds its DoppelState under this name. Being magic, it is untouchable on doubles.
+state_name = '__doppel_state__'
+
+# Names which the metaclass itself sets on Doppel classes and their auxiliary classes. They are never members of the
+# doubled class, so attribute plans leave them out altogether, whatever the declarations say.
+internal_attribute_names = frozenset([state_name, auxiliary_class_name, masking_class_name])
+
+
+
+# A DoppelState holds the bookkeeping of a single Doppel class: its declarations, its modes and the shared state built
+# from them. It lives under a single name in the __dict__ of the class, so that none of it hides a member of the class
+# being doubled, and so that none of it is enumerated as a member to clear.
+class DoppelState(object):
+    
+    def __init__(self, base, base_metaclass, parent_declarations):
+        self.base = base
+        self.base_metaclass = base_metaclass
+        self.declarations = Declarations(parent_declarations)
+        self.untouchable_attributes = DeclarationView(self.declarations, True)
+        self.explicitly_touchable_attributes = DeclarationView(self.declarations, False)
+        self.instance_attribute_names = set()
+        self.constructor_free = False
+        self.shadowed = False
+        self.lazy = False
+        self.deep = False
+        self.specs = {}
+        self.class_patches = {}
+        self.attribute_plan = None
+        self.override_plans = {}
+        self.lazy_resolver = None
+        self.live_doubles = None
+        
+        # The lock serializes changes to the declarations and the building of shared state such as the attribute plan,
+        # as well as the recording of instance attribute names the first time a double is seen with them. Once that
+        # state has been built, instantiation never takes the lock.
+        self.lock = threading.RLock()
+        self.thread_state = threading.local()
+
+
+
+# Exposes an attribute of the DoppelState of a Doppel class as a read only attribute of the class itself. It is not a
+# data descriptor, so a member of the same name on the class being doubled takes precedence over it. The metaclass
+# therefore always goes through the DoppelState.
+class StateAttribute(object):
+    
+    def __init__(self, name):
+        self.name = name
+    
+    
+    def __get__(self, doppel_class, metaclass):
+        if doppel_class is None:
+            return self
+        
+        return getattr(doppel_class.__doppel_state__, self.name)
 
 
 
 class Doppel(type):
     
+    base = StateAttribute('base')
+    base_metaclass = StateAttribute('base_metaclass')
+    declarations = StateAttribute('declarations')
+    untouchable_attributes = StateAttribute('untouchable_attributes')
+    explicitly_touchable_attributes = StateAttribute('explicitly_touchable_attributes')
+    instance_attribute_names = StateAttribute('instance_attribute_names')
+    constructor_free = StateAttribute('constructor_free')
+    shadowed = StateAttribute('shadowed')
+    lazy = StateAttribute('lazy')
+    deep = StateAttribute('deep')
+    specs = StateAttribute('specs')
+    class_patches = StateAttribute('class_patches')
+    attribute_plan = StateAttribute('attribute_plan')
+    live_doubles = StateAttribute('live_doubles')
+    
+    
     def __init__(self, name, bases, dct):
-        self.untouchable_attributes = []
-        self.explicitly_touchable_attributes = []
-        
-        self.base = bases[0]
-        if hasattr(self.base, '__metaclass__'):
-            self.base_metaclass = self.base.__metaclass__
+        base = bases[0]
+        if isinstance(base, Doppel):
+            parent_declarations = base.__doppel_state__.declarations
+            base_metaclass = base.__doppel_state__.base_metaclass
         else:
-            self.base_metaclass = type
+            parent_declarations = None
+            if hasattr(base, '__metaclass__'):
+                base_metaclass = base.__metaclass__
+            else:
+                base_metaclass = type
+        
+        type.__setattr__(self, state_name, DoppelState(base, base_metaclass, parent_declarations))
+        
+        # Doubles are pickled and copied through their Doppel class rather than through the class they double. See
+        # pickling.
+        if not isinstance(base, Doppel):
+            for name, function in (('__reduce_ex__', reduce_double), ('__setstate__', set_double_state), ('__copy__', copy_double), ('__deepcopy__', deepcopy_double)):
+                if name not in dct:
+                    type.__setattr__(self, name, function)
     
     
     def __call__(self, *args, **kwargs):
-        self_instance = self.base_metaclass.__call__(self, *args, **kwargs)
-        self_instance_dictionary = self.retrieve_attribute_dictionary(self_instance)
-        attribute_names = self_instance_dictionary.keys()
+        if instrumentation.enabled:
+            self_instance = instrumentation.measure_construction(self, self.construct, *args, **kwargs)
+        else:
+            self_instance = self.construct(*args, **kwargs)
+        
+        live_doubles = self.__doppel_state__.live_doubles
+        if live_doubles is not None:
+            live_doubles.add(self_instance)
+        
+        return self_instance
+    
+    
+    def construct(self, *args, **kwargs):
+        state = self.__doppel_state__
+        if state.constructor_free:
+            return self.construct_without_constructor()
+        
+        self_instance = state.base_metaclass.__call__(self, *args, **kwargs)
+        if instrumentation.enabled:
+            start = instrumentation.timer()
+            self.clear_instance(self_instance)
+            instrumentation.record_clearing(self, instrumentation.timer() - start)
+        else:
+            self.clear_instance(self_instance)
+        
+        return self_instance
+    
+    
+    def clear_instance(self, self_instance):
+        state = self.__doppel_state__
+        if state.lazy:
+            self.retrieve_lazy_resolver().apply(self_instance)
+            return
+        
+        attribute_plan = self.retrieve_attribute_plan()
+        if state.shadowed:
+            attribute_plan.apply_shadow(self_instance)
+        else:
+            attribute_plan.apply(self_instance)
+    
+    
+    # Creates a double without running the __init__ of the base class. Its attributes are laid out from the attribute
+    # plan: every class level attribute, as well as every instance attribute which has either been declared or been
+    # observed on a double created through the constructor, is set to None unless it is untouchable. Untouchable
+    # instance attributes are left unset, since no constructor has given them a value.
+    def create_without_constructor(self):
+        if instrumentation.enabled:
+            self_instance = instrumentation.measure_construction(self, self.construct_without_constructor)
+        else:
+            self_instance = self.construct_without_constructor()
         
-        self.make_magic_attributes_untouchable_unless_explicitly_touchable(attribute_names)
-        self.clear_attributes(self_instance, attribute_names)
+        live_doubles = self.__doppel_state__.live_doubles
+        if live_doubles is not None:
+            live_doubles.add(self_instance)
         
         return self_instance
     
     
+    def construct_without_constructor(self):
+        state = self.__doppel_state__
+        if state.lazy:
+            return self.retrieve_lazy_resolver().create_without_constructor()
+        
+        attribute_plan = self.retrieve_attribute_plan()
+        if state.shadowed:
+            shadow_class = attribute_plan.retrieve_shadow_class()
+            return shadow_class.__new__(shadow_class)
+        
+        self_instance = self.__new__(self)
+        attribute_plan.apply_without_constructor(self_instance)
+        
+        return self_instance
+    
+    
+    def declare_constructor_free(self, constructor_free = True):
+        self.__doppel_state__.constructor_free = constructor_free
+    
+    
+    # Doubles of a shadowed Doppel class are instances of a shadow class, a subclass built once per attribute plan
+    # which holds a class level None for every cleared attribute. Doubles created without a constructor therefore start
+    # without any instance attributes, and doubles created through the constructor only keep their untouchable instance
+    # attributes. The shadow class declares empty __slots__, so if the Doppel class and its bases declare __slots__ as
+    # well, its doubles carry no __dict__ at all. Attributes of such doubles can only be patched on the class.
+    def declare_shadowed(self, shadowed = True):
+        self.__doppel_state__.shadowed = shadowed
+    
+    
+    # Doubles of a lazy Doppel class resolve their class attributes to None the first time they are looked up, so that
+    # the cost of creating them does not depend on the width of the class. See LazyResolver. A lazy Doppel class is
+    # never shadowed.
+    def declare_lazy(self, lazy = True):
+        self.__doppel_state__.lazy = lazy
+    
+    
+    # Touchable attributes of the doubles of a deep Doppel class whose type is known, from an annotation or from a spec
+    # declared with declare_spec, resolve to child doubles of that type instead of None, the first time they are looked
+    # up. Child doubles are deep as well, so that whole object graphs are doubled on demand. See ChildDouble.
+    def declare_deep(self, deep = True):
+        state = self.__doppel_state__
+        with state.lock:
+            state.deep = deep
+            self.invalidate_attribute_plan()
+    
+    
+    def declare_spec(self, attribute_name, attribute_type):
+        state = self.__doppel_state__
+        with state.lock:
+            state.specs[attribute_name] = attribute_type
+            self.invalidate_attribute_plan()
+    
+    
+    # Returns the Doppel class of the child doubles which the attribute with the given name resolves to, or None.
+    def retrieve_child_class(self, attribute_name):
+        if not self.__doppel_state__.deep:
+            return None
+        
+        return self.retrieve_attribute_plan().child_classes.get(attribute_name)
+    
+    
+    def retrieve_lazy_resolver(self):
+        state = self.__doppel_state__
+        lazy_resolver = state.lazy_resolver
+        if lazy_resolver is None:
+            from .lazy import LazyResolver
+            
+            with state.lock:
+                lazy_resolver = state.lazy_resolver
+                if lazy_resolver is None:
+                    lazy_resolver = state.lazy_resolver = LazyResolver(self)
+        
+        lazy_resolver.validate()
+        return lazy_resolver
+    
+    
+    # Returns the names of the attributes which a lazy double has resolved so far, in the order in which it resolved them.
+    def retrieve_resolved_attributes(self, self_instance):
+        from .lazy import resolved_attributes_name
+        return list(object.__getattribute__(self_instance, '__dict__').get(resolved_attributes_name, ()))
+    
+    
+    def declare_instance_attribute(self, attribute_name):
+        state = self.__doppel_state__
+        with state.lock:
+            state.instance_attribute_names.add(attribute_name)
+            self.invalidate_attribute_plan()
+    
+    
     def clear_attributes(self, self_instance, attribute_names):
+        untouchable_attributes = self.__doppel_state__.untouchable_attributes
         for name in attribute_names:
-            if not (name in self.untouchable_attributes):
+            if not (name in untouchable_attributes):
                 object.__setattr__(self_instance, name, None)
     
     
-    def declare_untouchable(self, attribute_name):
-        if attribute_name in self.explicitly_touchable_attributes:
-            self.explicitly_touchable_attributes.remove(attribute_name)
+    # Declarations only apply to doubles created afterwards, unless propagate is True, in which case the attribute is
+    # also updated on every live double of the registered Doppel class and of its registered Doppel subclasses which
+    # inherit the declaration. Propagating from a class which is not registered fails without declaring anything. See
+    # update_live_doubles.
+    def declare_untouchable(self, attribute_name, propagate = False):
+        self.record_declaration(attribute_name, True, propagate)
+    
+    
+    def declare_touchable(self, attribute_name, propagate = False):
+        self.record_declaration(attribute_name, False, propagate)
+    
+    
+    def record_declaration(self, attribute_name, untouchable, propagate):
+        state = self.__doppel_state__
+        with state.lock:
+            if propagate and state.live_doubles is None:
+                raise ValueError('Declarations can only be propagated to the doubles of a registered Doppel class.')
+            
+            state.declarations.declare(attribute_name, untouchable)
+            if propagate:
+                self.propagate_declaration(attribute_name)
+    
+    
+    def propagate_declaration(self, attribute_name):
+        from . import registry
+        
+        declarations = self.__doppel_state__.declarations
+        self.update_live_doubles(attribute_name)
+        for doppel_class in list(registry.registered_classes):
+            if doppel_class is not self and doppel_class.inherits_declarations(declarations):
+                doppel_class.update_live_doubles(attribute_name)
+    
+    
+    # Returns True if and only if the given declarations are those of a Doppel ancestor of the class.
+    def inherits_declarations(self, declarations):
+        ancestor = self.__doppel_state__.declarations.parent
+        while ancestor is not None:
+            if ancestor is declarations:
+                return True
+            ancestor = ancestor.parent
+        
+        return False
+    
+    
+    # The live doubles of a registered Doppel class are tracked in a weak registry, so that declarations can be
+    # propagated to them and so that leaked doubles can be spotted. See the registry module. Doubles can only be
+    # registered if they can be weakly referenced.
+    def declare_registered(self, registered = True):
+        from . import registry
+        
+        state = self.__doppel_state__
+        with state.lock:
+            if not registered:
+                state.live_doubles = None
+                registry.unregister_class(self)
+            elif state.live_doubles is None:
+                if not self.__weakrefoffset__:
+                    raise ValueError('The doubles of %s cannot be weakly referenced, and so cannot be registered.' % self.__name__)
+                
+                state.live_doubles = weakref.WeakSet()
+                registry.register_class(self)
+    
+    
+    def retrieve_live_doubles(self):
+        live_doubles = self.__doppel_state__.live_doubles
+        if live_doubles is None:
+            return []
+        
+        return list(live_doubles)
+    
+    
+    # Updates the attribute with the given name on every live double to follow the current declarations, without
+    # touching any other attribute. An attribute which becomes untouchable shows the value of its class again. Instance
+    # attributes cleared by the constructor cannot be given their value back, and stay None.
+    def update_live_doubles(self, attribute_name):
+        state = self.__doppel_state__
+        if state.live_doubles is None:
+            raise ValueError('Declarations can only be propagated to the doubles of a registered Doppel class.')
         
-        self.untouchable_attributes.append(attribute_name)
+        if state.lazy:
+            self.retrieve_lazy_resolver()
+            for self_instance in self.retrieve_live_doubles():
+                object.__getattribute__(self_instance, '__dict__').pop(attribute_name, None)
+            
+            return
+        
+        attribute_plan = self.retrieve_attribute_plan()
+        for self_instance in self.retrieve_live_doubles():
+            attribute_plan.update(self_instance, attribute_name)
     
     
-    def declare_touchable(self, attribute_name):
-        if attribute_name in self.untouchable_attributes:
-            self.untouchable_attributes.remove(attribute_name)
+    # Overrides the declarations of the class for doubles created by the current thread inside the with block, without
+    # affecting any other thread. Overrides nest, and do not apply to lazy doubles, which may look their attributes up
+    # from any thread. The plans built for overrides are kept by the set of overrides they were built for, so that every
+    # block overriding the declarations in the same way reuses the same plan and auxiliary classes.
+    @contextlib.contextmanager
+    def overriding_declarations(self, untouchable = (), touchable = ()):
+        state = self.__doppel_state__
+        thread_state = state.thread_state
+        previous_overrides = getattr(thread_state, 'overrides', None)
+        previous_attribute_plan = getattr(thread_state, 'attribute_plan', None)
+        
+        overrides = dict(previous_overrides or ())
+        overrides.update(dict.fromkeys(untouchable, True))
+        overrides.update(dict.fromkeys(touchable, False))
         
-        self.explicitly_touchable_attributes.append(attribute_name)
+        thread_state.overrides = overrides
+        thread_state.attribute_plan = state.override_plans.get(frozenset(overrides.items()))
+        try:
+            yield self
+        finally:
+            thread_state.overrides = previous_overrides
+            thread_state.attribute_plan = previous_attribute_plan
     
     
     def make_magic_attributes_untouchable_unless_explicitly_touchable(self, attribute_names):
+        explicitly_touchable_attributes = self.__doppel_state__.explicitly_touchable_attributes
         for attribute_name in attribute_names:
-            if (not (attribute_name in self.explicitly_touchable_attributes)) and self.is_magic_attribute(attribute_name):
+            if (not (attribute_name in explicitly_touchable_attributes)) and self.is_magic_attribute(attribute_name):
                 self.declare_untouchable(attribute_name)
     
     
+    # Magic attributes are untouchable unless they have been explicitly declared touchable. This is the same rule
+    # that make_magic_attributes_untouchable_unless_explicitly_touchable enforces, without modifying the declarations.
+    def is_untouchable_attribute(self, attribute_name):
+        overrides = getattr(self.__doppel_state__.thread_state, 'overrides', None)
+        if overrides:
+            untouchable = overrides.get(attribute_name)
+            if untouchable is not None:
+                return untouchable
+        
+        return self.is_declared_untouchable_attribute(attribute_name)
+    
+    
+    def is_declared_untouchable_attribute(self, attribute_name):
+        untouchable = self.__doppel_state__.declarations.resolve(attribute_name)
+        if untouchable is None:
+            return self.is_magic_attribute(attribute_name)
+        
+        return untouchable
+    
+    
+    # The attribute plan is computed from the class the first time an instance is created, and is reused until the
+    # declarations of the class or of its Doppel ancestors change, or a class in the method resolution order gains or
+    # loses an attribute. Each instance only compares the cheap signature of the class with the one the plan was checked
+    # against; the members of the class are enumerated again only when it differs. Replacing an attribute in place does
+    # not change the signature, so a test which replaces a method of a base class with a property after creating doubles
+    # calls refresh_attribute_plan. A thread which overrides the declarations builds and keeps a plan of its own.
+    def retrieve_attribute_plan(self):
+        state = self.__doppel_state__
+        signature = self.compute_class_signature()
+        
+        thread_state = state.thread_state
+        overrides = getattr(thread_state, 'overrides', None)
+        if overrides:
+            attribute_plan = thread_state.attribute_plan
+            if attribute_plan is None or attribute_plan.signature != signature:
+                attribute_plan = thread_state.attribute_plan = self.update_attribute_plan(attribute_plan, signature)
+                with state.lock:
+                    state.override_plans[frozenset(overrides.items())] = attribute_plan
+            
+            return attribute_plan
+        
+        attribute_plan = state.attribute_plan
+        if attribute_plan is None or attribute_plan.signature != signature:
+            with state.lock:
+                attribute_plan = state.attribute_plan
+                if attribute_plan is None or attribute_plan.signature != signature:
+                    attribute_plan = state.attribute_plan = self.update_attribute_plan(attribute_plan, signature)
+        
+        return attribute_plan
+    
+    
+    # A plan only depends on the names and kinds of the members of the class. A plan whose signature changed while the
+    # members kept their kinds, such as after an attribute was removed and added again, is therefore kept and given the
+    # new signature, instead of being rebuilt along with its auxiliary classes.
+    def update_attribute_plan(self, attribute_plan, signature):
+        start = instrumentation.timer()
+        class_members = self.enumerate_plan_members()
+        if attribute_plan is not None and attribute_plan.signature is not None and attribute_plan.signature[-1] == signature[-1] and attribute_plan.class_members == class_members:
+            attribute_plan.signature = signature
+            return attribute_plan
+        
+        attribute_plan = AttributePlan(self, class_members, list(self.__doppel_state__.instance_attribute_names), signature)
+        if instrumentation.enabled:
+            instrumentation.record_enumeration(self, instrumentation.timer() - start)
+        
+        return attribute_plan
+    
+    
+    # Makes the next instance check the members of the class again, which picks up attributes replaced in place on the
+    # class or on its bases since the plan was computed. The plan itself is kept if the kinds of the members are the
+    # same.
+    def refresh_attribute_plan(self):
+        state = self.__doppel_state__
+        with state.lock:
+            if state.attribute_plan is not None:
+                state.attribute_plan.signature = None
+            if getattr(state.thread_state, 'attribute_plan', None) is not None:
+                state.thread_state.attribute_plan.signature = None
+            for attribute_plan in state.override_plans.values():
+                attribute_plan.signature = None
+    
+    
+    def enumerate_plan_members(self):
+        class_members = enumerate_class_members(self)
+        for name in internal_attribute_names:
+            class_members.pop(name, None)
+        
+        return class_members
+    
+    
+    def invalidate_attribute_plan(self):
+        state = self.__doppel_state__
+        state.attribute_plan = None
+        state.override_plans.clear()
+        state.thread_state.attribute_plan = None
+        if state.lazy_resolver is not None:
+            state.lazy_resolver.decisions.clear()
+    
+    
+    # Sets an attribute on the Doppel class itself and declares it untouchable, so that every double created from then
+    # on sees the value of the class attribute instead of None. Lazy doubles which have not yet looked the attribute up
+    # see it as well, and so do the live doubles of a registered Doppel class. Other doubles created earlier keep None.
+    def patch_class_attribute(self, attribute_name, value):
+        state = self.__doppel_state__
+        with state.lock:
+            type.__setattr__(self, attribute_name, value)
+            state.class_patches[attribute_name] = value
+            self.declare_untouchable(attribute_name)
+            self.invalidate_attribute_plan()
+            if state.live_doubles is not None:
+                self.propagate_declaration(attribute_name)
+    
+    
+    # Returns the signature of the class, which ends with its method resolution order and the version of its chain of
+    # declarations. See sign_class.
+    def compute_class_signature(self):
+        signature = sign_class(self)
+        signature.append(self.__mro__)
+        signature.append(self.__doppel_state__.declarations.chain_version())
+        return signature
+    
+    
+    # Returns a dictionary mapping the name of every attribute of obj to its kind, as found by the enumeration module
+    # without evaluating any of them.
     def retrieve_attribute_dictionary(self, obj):
-        attribute_dictionary = dict(inspect.getmembers(obj))
+        attribute_dictionary = enumerate_members(obj)
         return attribute_dictionary
     
     
@@ -76,4 +537,198 @@ class Doppel(type):
         if name[2] == underscore or name[-3] == underscore:
             return False
         
-        return True
\ No newline at end of file
+        return True
+
+
+
+# An AttributePlan records, for a single Doppel class, which attribute names are cleared on its instances and which
+# are kept. Class level names are classified once, when the plan is built. Names which only appear in the __dict__ of
+# an instance are classified the first time they are seen and recorded on the Doppel class, so that doubles created
+# without a constructor can be given the same layout.
+#
+# Properties take precedence over the __dict__ of an instance, and setting them would run their setters, so cleared
+# properties are instead masked by a None in the __dict__ of a masking class, a subclass built once per plan which
+# doubles are moved to once they are cleared. The masking class of a deep Doppel class also holds the ChildDouble of
+# every attribute which resolves to a child double. Doubles of Doppel classes which need neither keep their class.
+class AttributePlan(object):
+    
+    def __init__(self, doppel_class, class_members, instance_attribute_names, signature):
+        self.doppel_class = doppel_class
+        self.class_members = class_members
+        self.signature = signature
+        self.decisions = {}
+        
+        for name in class_members:
+            self.decide(name)
+        
+        # Attributes which resolve to child doubles are kept out of the instance, so that their ChildDouble is found.
+        self.child_classes = {}
+        if doppel_class.__doppel_state__.deep:
+            from .deep import create_child_classes
+            self.child_classes = create_child_classes(doppel_class, self.decide)
+        
+        for name in self.child_classes:
+            self.decisions[name] = False
+        
+        self.names_to_clear = tuple(name for name, kind in class_members.items() if self.decisions[name] and kind != PROPERTY)
+        self.properties_to_clear = tuple(name for name, kind in class_members.items() if self.decisions[name] and kind == PROPERTY)
+        self.names_to_keep = frozenset(name for name in class_members if not self.decisions[name] and name not in self.child_classes)
+        self.instance_names_to_clear = [name for name in instance_attribute_names if name not in self.decisions and self.decide(name)]
+        self.masking_required = bool(self.properties_to_clear or self.child_classes)
+        self.shadow_class = None
+        self.masking_class = None
+    
+    
+    # Returns True if and only if the attribute with the given name is to be cleared.
+    def decide(self, name):
+        decision = not self.doppel_class.is_untouchable_attribute(name)
+        self.decisions[name] = decision
+        return decision
+    
+    
+    # Records an instance attribute seen for the first time. Other threads may be creating doubles from the same plan, so
+    # the name is recorded under the lock of the Doppel class, once.
+    def observe_instance_attribute(self, name):
+        state = self.doppel_class.__doppel_state__
+        with state.lock:
+            decision = self.decisions.get(name)
+            if decision is not None:
+                return decision
+            
+            state.instance_attribute_names.add(name)
+            decision = self.decide(name)
+            if decision:
+                self.instance_names_to_clear.append(name)
+                if self.shadow_class is not None:
+                    type.__setattr__(self.shadow_class, name, None)
+        
+        return decision
+    
+    
+    def apply(self, self_instance):
+        instance_dictionary = getattr(self_instance, '__dict__', None)
+        if instance_dictionary:
+            decisions = self.decisions
+            for name in list(instance_dictionary):
+                decision = decisions.get(name)
+                if decision is None:
+                    decision = self.observe_instance_attribute(name)
+                
+                if decision:
+                    instance_dictionary[name] = None
+            
+            for name in self.child_classes:
+                instance_dictionary.pop(name, None)
+        
+        for name in self.names_to_clear:
+            object.__setattr__(self_instance, name, None)
+        
+        if self.masking_required:
+            object.__setattr__(self_instance, '__class__', self.retrieve_masking_class())
+    
+    
+    def apply_without_constructor(self, self_instance):
+        for name in self.instance_names_to_clear:
+            object.__setattr__(self_instance, name, None)
+        
+        for name in self.names_to_clear:
+            object.__setattr__(self_instance, name, None)
+        
+        if self.masking_required:
+            object.__setattr__(self_instance, '__class__', self.retrieve_masking_class())
+    
+    
+    # Moves a double created from an earlier plan to the class this plan gives doubles like it, shadowed or not, and
+    # updates the attribute with the given name on it. Doubles which have been moved to any other class, such as the
+    # tracking class of a snapshot, keep their class.
+    def update(self, self_instance, name):
+        doppel_class = self.doppel_class
+        current_class = type(self_instance)
+        shadowed = any(klass.__dict__.get(masking_class_name) == 'shadow' for klass in current_class.__mro__)
+        if shadowed:
+            target_class = self.retrieve_shadow_class()
+        elif self.masking_required:
+            target_class = self.retrieve_masking_class()
+        else:
+            target_class = doppel_class
+        
+        if current_class is not target_class and (current_class is doppel_class or current_class.__dict__.get(masking_class_name)):
+            object.__setattr__(self_instance, '__class__', target_class)
+        
+        try:
+            instance_dictionary = object.__getattribute__(self_instance, '__dict__')
+        except AttributeError:
+            instance_dictionary = {}
+        
+        decision = self.decisions.get(name)
+        if decision is None:
+            decision = self.decide(name)
+        
+        if name in self.child_classes or (decision and (shadowed or name in self.properties_to_clear)):
+            instance_dictionary.pop(name, None)
+        elif decision:
+            object.__setattr__(self_instance, name, None)
+        elif name in self.names_to_keep:
+            instance_dictionary.pop(name, None)
+    
+    
+    def apply_shadow(self, self_instance):
+        shadow_class = self.retrieve_shadow_class()
+        
+        instance_dictionary = getattr(self_instance, '__dict__', None)
+        if instance_dictionary:
+            decisions = self.decisions
+            for name in list(instance_dictionary):
+                decision = decisions.get(name)
+                if decision is None:
+                    decision = self.observe_instance_attribute(name)
+                
+                if decision:
+                    del instance_dictionary[name]
+            
+            for name in self.child_classes:
+                instance_dictionary.pop(name, None)
+        
+        object.__setattr__(self_instance, '__class__', shadow_class)
+    
+    
+    def retrieve_shadow_class(self):
+        if self.shadow_class is None:
+            with self.doppel_class.__doppel_state__.lock:
+                if self.shadow_class is None:
+                    self.shadow_class = self.create_shadow_class()
+        
+        return self.shadow_class
+    
+    
+    def create_shadow_class(self):
+        return self.create_auxiliary_class(self.names_to_clear + self.properties_to_clear + tuple(self.instance_names_to_clear), 'shadow')
+    
+    
+    def retrieve_masking_class(self):
+        if self.masking_class is None:
+            with self.doppel_class.__doppel_state__.lock:
+                if self.masking_class is None:
+                    self.masking_class = self.create_auxiliary_class(self.properties_to_clear, 'masking')
+        
+        return self.masking_class
+    
+    
+    # Returns a subclass of the Doppel class which holds None for each of the given names, and the ChildDouble of every
+    # attribute which resolves to a child double.
+    def create_auxiliary_class(self, names, kind):
+        doppel_class = self.doppel_class
+        auxiliary_dictionary = dict.fromkeys(names)
+        if self.child_classes:
+            from .deep import ChildDouble
+            auxiliary_dictionary.update((name, ChildDouble(name, child_class)) for name, child_class in self.child_classes.items())
+        
+        auxiliary_dictionary['__module__'] = doppel_class.__module__
+        auxiliary_dictionary['__slots__'] = ()
+        auxiliary_dictionary[auxiliary_class_name] = True
+        auxiliary_dictionary[masking_class_name] = kind
+        return type(doppel_class)(doppel_class.__name__, (doppel_class,), auxiliary_dictionary)
+
+
+
+register_doppel_metaclass(Doppel)
\ No newline at end of file
@@ -0,0 +1,83 @@
+# Standard modules
+import importlib
+import pkgutil
+
+# External modules
+
+# Internal modules
+from .factory import doppel_of
+
+
+
+# A DoppelNamespace holds a Doppel class for every class a module defines or imports from its own submodules, under the
+# name it has in the module, and, for a package, a nested DoppelNamespace for every one of its submodules, under the
+# name of the submodule. Doppel classes come from doppel_of, so they are shared with every other caller asking for the
+# same class and declarations, and a hierarchy of classes is only enumerated once, as described in the enumeration
+# module.
+#
+# Lazy Doppel classes are only created the first time they are looked up on the namespace, and submodules are only
+# imported the first time theirs is, so that a namespace over a large package costs almost nothing until it is used.
+class DoppelNamespace(object):
+    
+    def __init__(self, module, lazy = True, untouchable = (), touchable = (), deep = False):
+        self.__module = module
+        self.__options = (lazy, untouchable, touchable, deep)
+        self.__pending_classes = {}
+        self.__pending_submodules = set()
+        
+        for name, value in list(vars(module).items()):
+            if isinstance(value, type) and is_defined_within(value, module):
+                if is_lazy(lazy, name):
+                    self.__pending_classes[name] = value
+                else:
+                    setattr(self, name, self.__create_doppel_class(value))
+        
+        for module_info in pkgutil.iter_modules(getattr(module, '__path__', None) or []):
+            self.__pending_submodules.add(module_info[1])
+    
+    
+    def __getattr__(self, name):
+        pending_classes = self.__dict__.get('_DoppelNamespace__pending_classes', {})
+        if name in pending_classes:
+            value = self.__create_doppel_class(pending_classes.pop(name))
+        elif name in self.__dict__.get('_DoppelNamespace__pending_submodules', ()):
+            self.__pending_submodules.discard(name)
+            submodule = importlib.import_module('%s.%s' % (self.__module.__name__, name))
+            value = DoppelNamespace(submodule, *self.__options)
+        else:
+            raise AttributeError('%r has no class or submodule named %s.' % (self, name))
+        
+        setattr(self, name, value)
+        return value
+    
+    
+    def __dir__(self):
+        names = set(name for name in self.__dict__ if not name.startswith('_DoppelNamespace__'))
+        return sorted(names | set(self.__pending_classes) | self.__pending_submodules)
+    
+    
+    def __repr__(self):
+        return '<DoppelNamespace of %s>' % self.__module.__name__
+    
+    
+    def __create_doppel_class(self, cls):
+        lazy, untouchable, touchable, deep = self.__options
+        return doppel_of(cls, untouchable, touchable, deep)
+
+
+
+# Returns a DoppelNamespace for module, which may be a package. lazy is either a boolean which applies to every class,
+# or a collection of the names of the classes which are only created on first use.
+def doppel_module(module, lazy = True, untouchable = (), touchable = (), deep = False):
+    return DoppelNamespace(module, lazy, untouchable, touchable, deep)
+
+
+def is_defined_within(cls, module):
+    return cls.__module__ == module.__name__ or cls.__module__.startswith(module.__name__ + '.')
+
+
+def is_lazy(lazy, name):
+    if isinstance(lazy, bool):
+        return lazy
+    
+    return name in lazy
\ No newline at end of file
@@ -0,0 +1,287 @@
+# Standard modules
+try:
+    import copyreg
+except ImportError:
+    import copy_reg as copyreg
+import sys
+import types
+import weakref
+
+# External modules
+
+# Internal modules
+
+
+
+# Classes built by doppelganger on top of a Doppel class, such as shadow, lazy and tracking classes, carry this name in
+# their namespace. Their doubles are pickled as doubles of the Doppel class they were built on.
+auxiliary_class_name = '__doppel_auxiliary__'
+
+# Tracking classes, which the snapshot module moves doubles to, carry this name in their namespace. Copies of their
+# doubles are made with the class they were moved from.
+tracking_class_marker = '__doppel_tracking__'
+
+# Doppel classes rebuilt from descriptions, so that all the doubles of a Doppel class which are unpickled in the same
+# process share one rebuilt class. They are keyed weakly by their base, then by the hashable part of their description,
+# and are held weakly along with their class patches and specs, which have to be equal for a class to be shared.
+rebuilt_doppel_classes = weakref.WeakKeyDictionary()
+
+# Py_TPFLAGS_HEAPTYPE, as in the enumeration module. Only the slots of classes with it are carried over.
+heap_type_flag = 1 << 9
+
+# Set to the Doppel metaclass by register_doppel_metaclass, since the metaclass module imports this one.
+doppel_metaclass = []
+
+
+
+# A PatchedMethod stands in for a method patched onto a double or a Doppel class. Fakes created by tools carry a recipe,
+# the factory and arguments which created them, and are rebuilt from it, since closures cannot be pickled. Any other
+# function is pickled as it is, and so has to be importable.
+class PatchedMethod(object):
+    
+    def __init__(self, function):
+        self.recipe = getattr(function, 'recipe', None)
+        self.function = function if self.recipe is None else None
+    
+    
+    def __eq__(self, other):
+        return isinstance(other, PatchedMethod) and self.recipe == other.recipe and self.function is other.function
+    
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    
+    def create_function(self):
+        if self.recipe is None:
+            return self.function
+        
+        factory, factory_args = self.recipe
+        return factory(*factory_args)
+
+
+
+# Doppel classes which can be imported by name are pickled by name. Any other Doppel class, such as one defined inside
+# a test, is described by its base, its declarations, its modes, the names of its instance attributes, its class
+# level patches and its specs, and rebuilt from that description.
+def describe_doppel_class(doppel_class):
+    doppel_class = retrieve_primary_doppel_class(doppel_class)
+    
+    module = sys.modules.get(doppel_class.__module__)
+    if module is not None and getattr(module, doppel_class.__name__, None) is doppel_class:
+        return doppel_class
+    
+    state = doppel_class.__doppel_state__
+    base = state.base
+    if isinstance(base, type(doppel_class)):
+        base = describe_doppel_class(base)
+    
+    class_patches = dict((name, PatchedMethod(value)) for name, value in state.class_patches.items())
+    return (
+        doppel_class.__name__,
+        doppel_class.__module__,
+        base,
+        dict(state.declarations.local),
+        (state.constructor_free, state.shadowed, state.lazy, state.deep),
+        tuple(sorted(state.instance_attribute_names)),
+        class_patches,
+        dict(state.specs)
+    )
+
+
+def rebuild_doppel_class(description):
+    if not isinstance(description, tuple):
+        return description
+    
+    name, module, base, declarations, modes, instance_attribute_names, class_patches, specs = description
+    base = rebuild_doppel_class(base)
+    
+    key = (name, module, tuple(sorted(declarations.items())), modes, instance_attribute_names)
+    candidates = rebuilt_doppel_classes.setdefault(base, {}).setdefault(key, [])
+    for candidate in list(candidates):
+        candidate_reference, candidate_class_patches, candidate_specs = candidate
+        doppel_class = candidate_reference()
+        if doppel_class is None:
+            candidates.remove(candidate)
+        elif descriptions_match((candidate_class_patches, candidate_specs), (class_patches, specs)):
+            return doppel_class
+    
+    doppel_class = doppel_metaclass[0](name, (base,), {'__module__': module})
+    
+    for attribute_name, untouchable in declarations.items():
+        if untouchable:
+            doppel_class.declare_untouchable(attribute_name)
+        else:
+            doppel_class.declare_touchable(attribute_name)
+    
+    constructor_free, shadowed, lazy, deep = modes
+    doppel_class.declare_constructor_free(constructor_free)
+    doppel_class.declare_shadowed(shadowed)
+    doppel_class.declare_lazy(lazy)
+    doppel_class.declare_deep(deep)
+    
+    for attribute_name, attribute_type in specs.items():
+        doppel_class.declare_spec(attribute_name, attribute_type)
+    
+    for attribute_name in instance_attribute_names:
+        doppel_class.declare_instance_attribute(attribute_name)
+    
+    for attribute_name, patched_method in class_patches.items():
+        doppel_class.patch_class_attribute(attribute_name, patched_method.create_function())
+    
+    candidates.append((weakref.ref(doppel_class), class_patches, specs))
+    return doppel_class
+
+
+# Class patches are compared by their recipes, and by the identity of any other function. A comparison which fails
+# counts as a difference.
+def descriptions_match(description, other_description):
+    try:
+        return bool(description == other_description)
+    except Exception:
+        return False
+
+
+def retrieve_primary_doppel_class(cls):
+    while cls.__dict__.get(auxiliary_class_name):
+        cls = cls.__bases__[0]
+    
+    return cls
+
+
+
+# Doppel classes install reduce_double as the __reduce_ex__ of their doubles, and set_double_state as their
+# __setstate__. A double is pickled as the description of its Doppel class along with its state, and is rebuilt without
+# running any constructor.
+def reduce_double(self_instance, protocol = None):
+    state = retrieve_double_state(self_instance)
+    for name, value in state.items():
+        if is_bound_to(value, self_instance):
+            state[name] = PatchedMethod(value.__func__)
+    
+    return (rebuild_double, (describe_doppel_class(type(self_instance)),), state)
+
+
+def rebuild_double(description):
+    return rebuild_doppel_class(description).create_without_constructor()
+
+
+def set_double_state(self_instance, state):
+    for name, value in state.items():
+        if isinstance(value, PatchedMethod):
+            state[name] = value.create_function().__get__(self_instance)
+    
+    restore_double_state(self_instance, state)
+
+
+# Doppel classes also install copy_double as the __copy__ of their doubles, and deepcopy_double as their __deepcopy__,
+# so that copies keep the class of the double rather than going through a rebuilt one. Methods patched onto the double
+# are bound to the copy.
+def copy_double(self_instance):
+    copied_instance = create_copy(self_instance)
+    state = retrieve_double_state(self_instance)
+    for name, value in state.items():
+        if is_bound_to(value, self_instance):
+            state[name] = value.__func__.__get__(copied_instance)
+    
+    restore_double_state(copied_instance, state)
+    return copied_instance
+
+
+def deepcopy_double(self_instance, memo):
+    import copy
+    
+    copied_instance = create_copy(self_instance)
+    memo[id(self_instance)] = copied_instance
+    
+    state = retrieve_double_state(self_instance)
+    for name, value in state.items():
+        if is_bound_to(value, self_instance):
+            state[name] = value.__func__.__get__(copied_instance)
+        else:
+            state[name] = copy.deepcopy(value, memo)
+    
+    restore_double_state(copied_instance, state)
+    return copied_instance
+
+
+# Copies of the doubles of a registered Doppel class are registered as well.
+def create_copy(self_instance):
+    cls = type(self_instance)
+    while cls.__dict__.get(tracking_class_marker):
+        cls = cls.__bases__[0]
+    
+    copied_instance = cls.__new__(cls)
+    live_doubles = retrieve_primary_doppel_class(cls).__doppel_state__.live_doubles
+    if live_doubles is not None:
+        live_doubles.add(copied_instance)
+    
+    return copied_instance
+
+
+def is_bound_to(value, self_instance):
+    return getattr(value, '__self__', None) is self_instance and hasattr(value, '__func__')
+
+
+# The state of a double is made of the attributes in its __dict__, if it has one, and of the values of its slots which
+# are set and not masked by a shadow class, since masked slots are cleared.
+def retrieve_double_state(self_instance):
+    try:
+        instance_dictionary = object.__getattribute__(self_instance, '__dict__')
+    except AttributeError:
+        instance_dictionary = {}
+    
+    state = dict(instance_dictionary)
+    for name, descriptor in retrieve_slot_descriptors(type(self_instance)).items():
+        try:
+            state[name] = descriptor.__get__(self_instance, type(self_instance))
+        except AttributeError:
+            pass
+    
+    return state
+
+
+def restore_double_state(self_instance, state):
+    slot_descriptors = retrieve_slot_descriptors(type(self_instance))
+    instance_dictionary = None
+    for name, value in state.items():
+        descriptor = slot_descriptors.get(name)
+        if descriptor is not None:
+            descriptor.__set__(self_instance, value)
+            continue
+        
+        if instance_dictionary is None:
+            instance_dictionary = object.__getattribute__(self_instance, '__dict__')
+        
+        instance_dictionary[name] = value
+
+
+# Returns a dictionary mapping the name of every slot of cls which is not masked by a class earlier in its method
+# resolution order to the descriptor of the slot.
+def retrieve_slot_descriptors(cls):
+    slot_descriptors = {}
+    seen_names = set()
+    for klass in cls.__mro__:
+        heap_type = getattr(klass, '__flags__', heap_type_flag) & heap_type_flag
+        for name, value in klass.__dict__.items():
+            if name not in seen_names:
+                seen_names.add(name)
+                if heap_type and type(value) is types.MemberDescriptorType:
+                    slot_descriptors[name] = value
+    
+    return slot_descriptors
+
+
+# On Python 3, Doppel classes themselves can be pickled through the copyreg dispatch table. Python 2 always pickles
+# classes by name.
+def reduce_doppel_class(doppel_class):
+    description = describe_doppel_class(doppel_class)
+    if description is doppel_class:
+        return doppel_class.__name__
+    
+    return (rebuild_doppel_class, (description,))
+
+
+def register_doppel_metaclass(metaclass):
+    doppel_metaclass[:] = [metaclass]
+    copyreg.pickle(metaclass, reduce_doppel_class)
\ No newline at end of file
@@ -0,0 +1,150 @@
+# Standard modules
+import array
+import collections
+import time
+
+# External modules
+
+# Internal modules
+
+
+
+# Recording modes. A recorder in COUNTS mode only counts calls, one in ARGUMENTS mode also retains the arguments of the
+# most recent calls, and one in TIMESTAMPS mode retains the time of each of those calls as well.
+COUNTS = 'counts'
+ARGUMENTS = 'arguments'
+TIMESTAMPS = 'timestamps'
+
+Call = collections.namedtuple('Call', ['args', 'kwargs', 'timestamp'])
+
+
+
+# A CallRecorder retains the most recent calls made to a fake in a ring buffer whose slots are allocated up front, so
+# that recording millions of calls takes a bounded amount of memory. call_count counts every call, including those
+# which have since been overwritten in the buffer. If a sink from the streaming module is given, every call is also
+# written to it, so that a complete log of the calls can be kept outside of memory.
+class CallRecorder(object):
+    
+    def __init__(self, mode = ARGUMENTS, capacity = 1024, sink = None):
+        if mode not in (COUNTS, ARGUMENTS, TIMESTAMPS):
+            raise ValueError('Unknown recording mode: %r' % (mode,))
+        
+        if capacity < 1:
+            raise ValueError('A CallRecorder needs a capacity of at least one call.')
+        
+        self.mode = mode
+        self.capacity = capacity
+        self.call_count = 0
+        self.sink = sink
+        
+        if mode == COUNTS:
+            self.slots = None
+            self.timestamps = None
+        elif mode == ARGUMENTS:
+            self.slots = [None]*capacity
+            self.timestamps = None
+        else:
+            self.slots = [None]*capacity
+            self.timestamps = array.array('d', [0.0])*capacity
+        
+        self.select_record_methods()
+    
+    
+    # The record methods are bound to the recorder, so they are left out of the pickled state and chosen again on
+    # unpickling.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['record']
+        del state['record_in_buffer']
+        return state
+    
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.select_record_methods()
+    
+    
+    def select_record_methods(self):
+        self.record_in_buffer = {COUNTS: self.record_count, ARGUMENTS: self.record_arguments, TIMESTAMPS: self.record_arguments_and_timestamp}[self.mode]
+        self.record = self.record_in_buffer if self.sink is None else self.record_and_stream
+    
+    
+    def record_count(self, method_args, method_kwargs):
+        self.call_count += 1
+    
+    
+    def record_arguments(self, method_args, method_kwargs):
+        self.slots[self.call_count % self.capacity] = (method_args, method_kwargs)
+        self.call_count += 1
+    
+    
+    def record_arguments_and_timestamp(self, method_args, method_kwargs):
+        index = self.call_count % self.capacity
+        self.slots[index] = (method_args, method_kwargs)
+        self.timestamps[index] = time.time()
+        self.call_count += 1
+    
+    
+    def record_and_stream(self, method_args, method_kwargs):
+        self.record_in_buffer(method_args, method_kwargs)
+        timestamp = self.timestamps[(self.call_count - 1) % self.capacity] if self.timestamps is not None else None
+        self.sink.write(Call(method_args, method_kwargs, timestamp))
+    
+    
+    def reset(self):
+        self.call_count = 0
+        if self.slots is not None:
+            self.slots[:] = [None]*self.capacity
+    
+    
+    def take_snapshot(self):
+        slots = list(self.slots) if self.slots is not None else None
+        timestamps = array.array('d', self.timestamps) if self.timestamps is not None else None
+        return (self.call_count, slots, timestamps)
+    
+    
+    # Restores the state captured by take_snapshot. Only the slots written since then are copied back.
+    def restore_snapshot(self, snapshot):
+        call_count, slots, timestamps = snapshot
+        if slots is not None:
+            if self.call_count - call_count >= self.capacity:
+                indices = range(self.capacity)
+            else:
+                indices = [index % self.capacity for index in range(call_count, self.call_count)]
+            
+            for index in indices:
+                self.slots[index] = slots[index]
+                if timestamps is not None:
+                    self.timestamps[index] = timestamps[index]
+        
+        self.call_count = call_count
+    
+    
+    # Returns the retained calls, oldest first.
+    def calls(self):
+        if self.slots is None:
+            raise ValueError('A CallRecorder in %r mode does not retain calls.' % (self.mode,))
+        
+        retained_count = min(self.call_count, self.capacity)
+        first_index = self.call_count - retained_count
+        return [self.make_call(index % self.capacity) for index in range(first_index, self.call_count)]
+    
+    
+    def last_call(self):
+        if self.slots is None:
+            raise ValueError('A CallRecorder in %r mode does not retain calls.' % (self.mode,))
+        
+        if self.call_count == 0:
+            return None
+        
+        return self.make_call((self.call_count - 1) % self.capacity)
+    
+    
+    def calls_matching(self, *method_args, **method_kwargs):
+        return [call for call in self.calls() if call.args == method_args and call.kwargs == method_kwargs]
+    
+    
+    def make_call(self, index):
+        method_args, method_kwargs = self.slots[index]
+        timestamp = self.timestamps[index] if self.timestamps is not None else None
+        return Call(method_args, method_kwargs, timestamp)
\ No newline at end of file
@@ -0,0 +1,49 @@
+# Standard modules
+import sys
+import weakref
+
+# External modules
+
+# Internal modules
+from .instrumentation import qualified_name
+
+
+
+# Every Doppel class which has been declared registered and is still alive.
+registered_classes = weakref.WeakSet()
+
+
+
+def register_class(doppel_class):
+    registered_classes.add(doppel_class)
+
+
+def unregister_class(doppel_class):
+    registered_classes.discard(doppel_class)
+
+
+# Returns the approximate number of bytes taken by a double: its own size and the size of its __dict__, excluding the
+# values it refers to.
+def measure_double(double):
+    size = sys.getsizeof(double)
+    try:
+        size += sys.getsizeof(object.__getattribute__(double, '__dict__'))
+    except AttributeError:
+        pass
+    
+    return size
+
+
+# Returns a list holding, for every registered Doppel class, its qualified name, the number of its live doubles and
+# their approximate size in bytes, largest first, so that doubles leaked by a long suite stand out.
+def report():
+    rows = []
+    for doppel_class in list(registered_classes):
+        live_doubles = doppel_class.retrieve_live_doubles()
+        rows.append({
+            'class': qualified_name(doppel_class),
+            'live': len(live_doubles),
+            'bytes': sum(measure_double(double) for double in live_doubles)
+        })
+    
+    return sorted(rows, key = lambda row: row['bytes'], reverse = True)
\ No newline at end of file
@@ -0,0 +1,139 @@
+# Standard modules
+import weakref
+
+# External modules
+
+# Internal modules
+
+
+
+# Signature checkers are cached by the function they check. A checker only refers to the class which defines that
+# function through a weak reference, so the cache never keeps a class alive.
+signature_checkers = weakref.WeakKeyDictionary()
+
+default_placeholder_name = '__doppel_default'
+self_placeholder_name = '__doppel_self'
+
+
+
+# A SignatureChecker holds check, a function compiled with the same parameters as a real method, which does nothing
+# but let Python bind the arguments it is called with. Calling it with arguments the real method would reject raises
+# the same TypeError. Since the binding happens in the interpreter, checking costs little more than an empty call.
+class SignatureChecker(object):
+    
+    def __init__(self, owner, name, function, static):
+        self.owner_reference = weakref.ref(owner)
+        self.name = name
+        self.check = compile_check(name, function, static)
+    
+    
+    def __reduce__(self):
+        return (retrieve_signature_checker, (self.owner_reference(), self.name))
+
+
+
+# Returns the signature checker for the method with the given name on obj, which may be an instance or a class. The
+# method is looked up on the class of obj, skipping over attributes which have been cleared. See find_method.
+def retrieve_signature_checker(obj, name):
+    owner, attribute = find_method(obj, name)
+    static = isinstance(attribute, staticmethod)
+    function = attribute.__func__ if isinstance(attribute, (staticmethod, classmethod)) else attribute
+    
+    signature_checker = signature_checkers.get(function)
+    if signature_checker is None:
+        signature_checker = signature_checkers[function] = SignatureChecker(owner, name, function, static)
+    
+    return signature_checker
+
+
+# Doppel classes, along with the auxiliary classes built for them, are skipped, so that methods are checked against the
+# real class being doubled even when a fake has been patched onto its Doppel class.
+def find_method(obj, name):
+    from .metaclass import Doppel
+    
+    cls = obj if isinstance(obj, type) else type(obj)
+    for klass in cls.__mro__:
+        if isinstance(klass, Doppel):
+            continue
+        
+        attribute = klass.__dict__.get(name)
+        if attribute is not None:
+            return klass, attribute
+    
+    raise ValueError('%s has no method %s whose signature could be checked.' % (cls.__name__, name))
+
+
+# The check is named after the method, so that the TypeError it raises reads like the one the method would raise.
+def compile_check(name, function, static = False):
+    parameters = describe_parameters(function)
+    if static:
+        parameters.insert(0, self_placeholder_name)
+    
+    namespace = {default_placeholder_name: object()}
+    exec('def %s(%s):\n    pass' % (name, ', '.join(parameters)), namespace)
+    return namespace[name]
+
+
+# Returns the parameter list of function as a list of strings, in which every default value is replaced by a
+# placeholder. inspect is only imported once a signature is needed, since it takes longer to import than the rest of
+# the package.
+def describe_parameters(function):
+    import inspect
+    signature = getattr(inspect, 'signature', None)
+    if signature is None:
+        return describe_parameters_from_argspec(function)
+    
+    try:
+        parameters = signature(function).parameters.values()
+    except (TypeError, ValueError):
+        raise ValueError('The signature of %r cannot be determined.' % (function,))
+    
+    descriptions = []
+    previous_kind = None
+    for parameter in parameters:
+        kind = parameter.kind
+        if previous_kind == parameter.POSITIONAL_ONLY and kind != previous_kind:
+            descriptions.append('/')
+        
+        if kind == parameter.KEYWORD_ONLY and previous_kind not in (parameter.VAR_POSITIONAL, parameter.KEYWORD_ONLY):
+            descriptions.append('*')
+        
+        if kind == parameter.VAR_POSITIONAL:
+            descriptions.append('*' + parameter.name)
+        elif kind == parameter.VAR_KEYWORD:
+            descriptions.append('**' + parameter.name)
+        elif parameter.default is not parameter.empty:
+            descriptions.append('%s=%s' % (parameter.name, default_placeholder_name))
+        else:
+            descriptions.append(parameter.name)
+        
+        previous_kind = kind
+    
+    if previous_kind == inspect.Parameter.POSITIONAL_ONLY:
+        descriptions.append('/')
+    
+    return descriptions
+
+
+def describe_parameters_from_argspec(function):
+    import inspect
+    try:
+        argument_specification = inspect.getargspec(function)
+    except TypeError:
+        raise ValueError('The signature of %r cannot be determined.' % (function,))
+    
+    arguments = argument_specification.args
+    if any(not isinstance(argument, str) for argument in arguments):
+        raise ValueError('The signature of %r unpacks tuples, and cannot be checked.' % (function,))
+    
+    default_count = len(argument_specification.defaults or ())
+    descriptions = list(arguments[:len(arguments) - default_count])
+    descriptions.extend('%s=%s' % (argument, default_placeholder_name) for argument in arguments[len(arguments) - default_count:])
+    
+    if argument_specification.varargs:
+        descriptions.append('*' + argument_specification.varargs)
+    
+    if argument_specification.keywords:
+        descriptions.append('**' + argument_specification.keywords)
+    
+    return descriptions
\ No newline at end of file
@@ -0,0 +1,157 @@
+# Standard modules
+import weakref
+
+# External modules
+
+# Internal modules
+from .pickling import auxiliary_class_name, tracking_class_marker
+
+
+
+# The names of the attributes set or deleted on every tracked double since its snapshot, keyed by the id of the double,
+# along with a weak reference to the double which drops the entry once the double is collected.
+dirty_attributes = {}
+
+# The tracking subclass built for each class, keyed weakly by the class and held through a weak reference, since a
+# tracking class references the class it was built for as its base. A tracking class lives for as long as one of its
+# doubles does, and is built anew once it has been collected.
+tracking_classes = weakref.WeakKeyDictionary()
+
+
+
+# A Snapshot captures the attributes of a double and the state of the recorders of its patched methods. While the
+# snapshot exists, the double is an instance of a tracking subclass of its class, which records the name of every
+# attribute set or deleted on it, so that restoring the double only touches the attributes which have changed since.
+# Attributes changed by writing to the __dict__ of the double directly are not tracked. Doubles without a __dict__, such
+# as shadowed doubles of classes with __slots__, and doubles which cannot be weakly referenced, cannot be snapshotted.
+class Snapshot(object):
+    
+    def __init__(self, double):
+        self.double = double
+        
+        try:
+            instance_dictionary = object.__getattribute__(double, '__dict__')
+        except AttributeError:
+            raise ValueError('%r has no __dict__, so its attributes cannot be snapshotted.' % (double,))
+        
+        double_id = id(double)
+        try:
+            double_reference = weakref.ref(double, lambda reference: dirty_attributes.pop(double_id, None))
+        except TypeError:
+            raise ValueError('%r cannot be weakly referenced, so its attributes cannot be snapshotted.' % (double,))
+        
+        self.attributes = dict(instance_dictionary)
+        
+        self.recorder_snapshots = []
+        for value in self.attributes.values():
+            recorder = getattr(value, 'recorder', None)
+            if recorder is not None:
+                self.recorder_snapshots.append((recorder, recorder.take_snapshot()))
+        
+        dirty_attributes[double_id] = (set(), double_reference)
+        track(double)
+    
+    
+    def restore(self):
+        instance_dictionary = object.__getattribute__(self.double, '__dict__')
+        dirty_names = dirty_attributes[id(self.double)][0]
+        attributes = self.attributes
+        
+        for name in dirty_names:
+            if name in attributes:
+                instance_dictionary[name] = attributes[name]
+            else:
+                instance_dictionary.pop(name, None)
+        
+        dirty_names.clear()
+        
+        for recorder, recorder_snapshot in self.recorder_snapshots:
+            if recorder.call_count != recorder_snapshot[0]:
+                recorder.restore_snapshot(recorder_snapshot)
+
+
+
+def take_snapshot(double):
+    return Snapshot(double)
+
+
+def track(double):
+    cls = type(double)
+    if cls.__dict__.get(tracking_class_marker):
+        return
+    
+    object.__setattr__(double, '__class__', retrieve_tracking_class(cls))
+
+
+def retrieve_tracking_class(cls):
+    tracking_class_reference = tracking_classes.get(cls)
+    tracking_class = tracking_class_reference() if tracking_class_reference is not None else None
+    if tracking_class is None:
+        tracking_class = create_tracking_class(cls)
+        tracking_classes[cls] = weakref.ref(tracking_class)
+    
+    return tracking_class
+
+
+def create_tracking_class(cls):
+    original_setattr = cls.__setattr__
+    original_delattr = cls.__delattr__
+    
+    def __setattr__(self_instance, name, value):
+        original_setattr(self_instance, name, value)
+        dirty_attributes[id(self_instance)][0].add(name)
+    
+    def __delattr__(self_instance, name):
+        original_delattr(self_instance, name)
+        dirty_attributes[id(self_instance)][0].add(name)
+    
+    tracking_dictionary = {
+        '__setattr__': __setattr__,
+        '__delattr__': __delattr__,
+        '__module__': cls.__module__,
+        '__slots__': (),
+        tracking_class_marker: True,
+        auxiliary_class_name: True
+    }
+    return type(cls)(cls.__name__, (cls,), tracking_dictionary)
+
+
+
+# A DoublePool hands out doubles built by create_double, a callable which creates and configures a double. Each double
+# is snapshotted when it is built, and restored when it is released back into the pool, so that a test suite can
+# reuse a few configured doubles instead of building new ones for every test. Only doubles acquired from the pool, and
+# not released since, can be released into it.
+class DoublePool(object):
+    
+    def __init__(self, create_double, size = 0):
+        self.create_double = create_double
+        self.available = []
+        self.snapshots = {}
+        self.acquired = set()
+        
+        for j in range(size):
+            self.available.append(self.build())
+    
+    
+    def build(self):
+        double = self.create_double()
+        self.snapshots[id(double)] = take_snapshot(double)
+        return double
+    
+    
+    def acquire(self):
+        double = self.available.pop() if self.available else self.build()
+        self.acquired.add(id(double))
+        return double
+    
+    
+    def release(self, double):
+        if id(double) not in self.acquired:
+            if id(double) in self.snapshots:
+                raise ValueError('%r was already released into this pool.' % (double,))
+            
+            raise ValueError('%r was not acquired from this pool.' % (double,))
+        
+        self.acquired.remove(id(double))
+        self.snapshots[id(double)].restore()
+        self.available.append(double)
\ No newline at end of file
@@ -0,0 +1,151 @@
+# Standard modules
+import json
+import pickle
+import struct
+import threading
+
+# External modules
+
+# Internal modules
+from .recording import Call
+
+
+
+# A binary call log starts with a header, followed by frames. Each frame holds its length and a pickled batch of calls.
+binary_magic = b'DPCL'
+binary_version = 1
+binary_header_format = struct.Struct('<4sB')
+frame_format = struct.Struct('<I')
+pickle_protocol = 2
+
+
+
+# A sink receives the calls recorded by a CallRecorder. Calls are buffered, and handed over in batches of buffer_size
+# calls, so that at most buffer_size calls are held in memory whatever the length of the log. The last batch is only
+# written when the sink is flushed or closed, which also happens on leaving a with block. Sinks which write to a file
+# flush it after every batch, so that the log can be read while it is being written.
+class BufferedSink(object):
+    
+    def __init__(self, buffer_size = 1000):
+        if buffer_size < 1:
+            raise ValueError('A sink needs a buffer size of at least one call.')
+        
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.lock = threading.Lock()
+    
+    
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+    
+    
+    def write(self, call):
+        with self.lock:
+            self.buffer.append(call)
+            if len(self.buffer) >= self.buffer_size:
+                self.flush_buffer()
+    
+    
+    def flush(self):
+        with self.lock:
+            self.flush_buffer()
+    
+    
+    def flush_buffer(self):
+        if self.buffer:
+            batch = self.buffer
+            self.buffer = []
+            self.write_batch(batch)
+    
+    
+    def close(self):
+        self.flush()
+    
+    
+    def write_batch(self, batch):
+        raise NotImplementedError()
+
+
+
+# Writes one JSON object per call. Arguments which are not JSON serializable are written as their repr.
+class JSONLinesSink(BufferedSink):
+    
+    def __init__(self, path, buffer_size = 1000):
+        super(JSONLinesSink, self).__init__(buffer_size)
+        self.file = open(path, 'w')
+    
+    
+    def write_batch(self, batch):
+        self.file.write(''.join(json.dumps({'args': call.args, 'kwargs': call.kwargs, 'timestamp': call.timestamp}, default = repr) + '\n' for call in batch))
+        self.file.flush()
+    
+    
+    def close(self):
+        super(JSONLinesSink, self).close()
+        self.file.close()
+
+
+
+# Writes every batch as one pickled frame. Arguments have to be picklable.
+class BinarySink(BufferedSink):
+    
+    def __init__(self, path, buffer_size = 1000):
+        super(BinarySink, self).__init__(buffer_size)
+        self.file = open(path, 'wb')
+        self.file.write(binary_header_format.pack(binary_magic, binary_version))
+    
+    
+    def write_batch(self, batch):
+        frame = pickle.dumps([tuple(call) for call in batch], pickle_protocol)
+        self.file.write(frame_format.pack(len(frame)))
+        self.file.write(frame)
+        self.file.flush()
+    
+    
+    def close(self):
+        super(BinarySink, self).close()
+        self.file.close()
+
+
+
+# Calls callback with every batch, as a list of calls.
+class CallbackSink(BufferedSink):
+    
+    def __init__(self, callback, buffer_size = 1000):
+        super(CallbackSink, self).__init__(buffer_size)
+        self.callback = callback
+    
+    
+    def write_batch(self, batch):
+        self.callback(batch)
+
+
+
+# Iterates over the calls in the log at path, written by a JSONLinesSink or a BinarySink, reading one line or frame at
+# a time. The format is told by the header of the file.
+def read_call_log(path):
+    with open(path, 'rb') as log_file:
+        header = log_file.read(binary_header_format.size)
+        if len(header) == binary_header_format.size and binary_header_format.unpack(header) == (binary_magic, binary_version):
+            for call in read_binary_frames(log_file):
+                yield call
+        else:
+            log_file.seek(0)
+            for line in log_file:
+                record = json.loads(line.decode('utf-8'))
+                yield Call(tuple(record['args']), record['kwargs'], record['timestamp'])
+
+
+def read_binary_frames(log_file):
+    while True:
+        length = log_file.read(frame_format.size)
+        if len(length) < frame_format.size:
+            return
+        
+        frame = log_file.read(frame_format.unpack(length)[0])
+        for call in pickle.loads(frame):
+            yield Call(*call)
\ No newline at end of file
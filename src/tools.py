@@ -1,35 +1,220 @@
 # Standard modules
+import sys
+import weakref
 
 # External modules
 
 # Internal modules
+from . import instrumentation
+from .dispatch import DispatchTable, ReturnSequence, ReturnValue, NoDefault
+from .signatures import retrieve_signature_checker
 
 
 
-def patch_returner(obj, name, fake_method_return_value):
-    fake_returner = create_fake_returner(fake_method_return_value)
+# Coroutine functions only exist from Python 3.5 on. Whether a method is one is decided once for each class and name,
+# and kept for as long as the class lives.
+coroutines_supported = sys.version_info >= (3, 5)
+
+coroutine_methods = weakref.WeakKeyDictionary()
+
+
+# If the method being patched is a coroutine function on the class of obj, the fake is a coroutine function as well,
+# and latency, if given, is the number of seconds it sleeps for before returning. Latency can only be simulated by
+# coroutine fakes. If strict is True, the fake raises a TypeError whenever it is called with arguments the method being
+# patched would reject.
+def patch_returner(obj, name, fake_method_return_value, recorder = None, latency = None, strict = False):
+    signature_checker = retrieve_signature_checker(obj, name) if strict else None
+    if is_coroutine_method(obj, name):
+        fake_returner = create_fake_coroutine_returner(fake_method_return_value, recorder, latency, signature_checker)
+    else:
+        reject_latency(name, latency)
+        fake_returner = create_fake_returner(fake_method_return_value, recorder, signature_checker)
+    
     monkey_patch(obj, name, fake_returner)
 
 
-def patch_caller(obj, name, function_to_call, *args, **kwargs):
-    fake_caller = create_fake_caller(function_to_call, *args, **kwargs)
+def patch_caller(obj, name, function_to_call, recorder = None, latency = None, strict = False):
+    signature_checker = retrieve_signature_checker(obj, name) if strict else None
+    if is_coroutine_method(obj, name):
+        fake_caller = create_fake_coroutine_caller(function_to_call, recorder, latency, signature_checker)
+    else:
+        reject_latency(name, latency)
+        fake_caller = create_fake_caller(function_to_call, recorder, signature_checker)
+    
     monkey_patch(obj, name, fake_caller)
 
 
+# Patches a fake which returns the value table maps the arguments of each call to, as described by DispatchTable. If a
+# call is not in the table, the fake returns default, or raises a KeyError if there is none.
+def patch_dispatcher(obj, name, table, default = NoDefault, key = None, recorder = None, latency = None, strict = False):
+    patch_caller(obj, name, DispatchTable(table, default, key), recorder, latency, strict)
+
+
+# Patches a fake which returns the next of values on each call, as described by ReturnSequence.
+def patch_sequence(obj, name, values, default = NoDefault, recorder = None, latency = None, strict = False):
+    patch_caller(obj, name, ReturnSequence(values, default), recorder, latency, strict)
+
+
+# Patches several attributes of obj in one pass. fakes maps attribute names either to callables, or to any other value,
+# which the patched method returns. Callables which can be bound, such as functions, are patched in as methods of obj in
+# the same way as by monkey_patch. Other callables, such as classes, builtin methods and partial objects, are called
+# with the arguments of each call, as by patch_caller. To return a callable rather than call it, wrap it in a
+# ReturnValue.
+def patch_many(obj, fakes):
+    for name, fake in fakes.items():
+        setattr(obj, name, create_fake_method(fake, is_coroutine_method(obj, name)).__get__(obj))
+    
+    if instrumentation.enabled:
+        instrumentation.record_patches(type(obj), len(fakes))
+
+
+# Patches a method onto a Doppel class once, rather than onto each of its doubles. Doubles created afterwards share
+# the function through the class and carry no bound method of their own. Doubles created earlier only see it if the
+# Doppel class is registered or lazy; the others keep None.
+def patch_class(doppel_class, name, function):
+    doppel_class.patch_class_attribute(name, function)
+    
+    if instrumentation.enabled:
+        instrumentation.record_patches(doppel_class, 1)
+
+
+def patch_class_many(doppel_class, fakes):
+    for name, fake in fakes.items():
+        patch_class(doppel_class, name, create_fake_method(fake, is_coroutine_method(doppel_class, name)))
+
+
+def create_fake_method(fake, coroutine = False):
+    if isinstance(fake, ReturnValue):
+        fake = fake.value
+    elif callable(fake):
+        if hasattr(type(fake), '__get__'):
+            return fake
+        
+        if coroutine:
+            return create_fake_coroutine_caller(fake)
+        
+        return create_fake_caller(fake)
+    
+    if coroutine:
+        return create_fake_coroutine_returner(fake)
+    
+    return create_fake_returner(fake)
+
+
 def monkey_patch(obj, name, function):
     bound_method = function.__get__(obj)
     setattr(obj, name, bound_method)
+    
+    if instrumentation.enabled:
+        instrumentation.record_patch(obj)
+
+
+# If a recorder is given, every call to the fake is recorded in it and the recorder is available as the recorder
+# attribute of the fake. Otherwise, the fake does nothing but return. Every fake carries a recipe attribute, holding the
+# factory and the arguments it was created from, so that doubles patched with it can be pickled. If a signature checker
+# is given, every call is checked against it before anything else happens.
+def create_fake_returner(fake_returner_return_value, recorder = None, signature_checker = None):
+    if recorder is None and signature_checker is None:
+        def fake_returner(self, *method_args, **method_kwargs):
+            return fake_returner_return_value
+    elif signature_checker is None:
+        record = recorder.record
+        
+        def fake_returner(self, *method_args, **method_kwargs):
+            record(method_args, method_kwargs)
+            return fake_returner_return_value
+    else:
+        record = recorder.record if recorder is not None else None
+        check = signature_checker.check
+        
+        def fake_returner(self, *method_args, **method_kwargs):
+            check(self, *method_args, **method_kwargs)
+            if record is not None:
+                record(method_args, method_kwargs)
+            
+            return fake_returner_return_value
+    
+    if recorder is not None:
+        fake_returner.recorder = recorder
+    
+    fake_returner.recipe = (create_fake_returner, (fake_returner_return_value, recorder, signature_checker))
+    return fake_returner
 
 
-def create_fake_returner(fake_returner_return_value):
-    def fake_returner(self, *method_args, **method_kwargs):
-        return fake_returner_return_value
+def create_fake_caller(function_to_call, recorder = None, signature_checker = None):
+    if recorder is None and signature_checker is None:
+        def fake_caller(self, *method_args, **method_kwargs):
+            return function_to_call(*method_args, **method_kwargs)
+    elif signature_checker is None:
+        record = recorder.record
+        
+        def fake_caller(self, *method_args, **method_kwargs):
+            record(method_args, method_kwargs)
+            return function_to_call(*method_args, **method_kwargs)
+    else:
+        record = recorder.record if recorder is not None else None
+        check = signature_checker.check
+        
+        def fake_caller(self, *method_args, **method_kwargs):
+            check(self, *method_args, **method_kwargs)
+            if record is not None:
+                record(method_args, method_kwargs)
+            
+            return function_to_call(*method_args, **method_kwargs)
+    
+    if recorder is not None:
+        fake_caller.recorder = recorder
     
+    fake_caller.recipe = (create_fake_caller, (function_to_call, recorder, signature_checker))
+    return fake_caller
+
+
+# The coroutine fakes live in the asynchronous module, which needs Python 3.5 or later and is only imported on demand.
+def create_fake_coroutine_returner(fake_returner_return_value, recorder = None, latency = None, signature_checker = None):
+    from . import asynchronous
+    fake_returner = asynchronous.create_fake_coroutine_returner(fake_returner_return_value, recorder, latency, signature_checker)
+    fake_returner.recipe = (create_fake_coroutine_returner, (fake_returner_return_value, recorder, latency, signature_checker))
     return fake_returner
 
 
-def create_fake_caller(function_to_call):
-    def fake_caller(self, *method_args, **method_kwargs):
-        return function_to_call(*method_args, **method_kwargs)
+def create_fake_coroutine_caller(function_to_call, recorder = None, latency = None, signature_checker = None):
+    from . import asynchronous
+    fake_caller = asynchronous.create_fake_coroutine_caller(function_to_call, recorder, latency, signature_checker)
+    fake_caller.recipe = (create_fake_coroutine_caller, (function_to_call, recorder, latency, signature_checker))
+    return fake_caller
+
+
+# Returns True if and only if the attribute with the given name on obj, which may be an instance or a class, is a
+# coroutine function. Cleared attributes are skipped over, so that the method of the doubled class is found even on
+# shadowed doubles.
+def is_coroutine_method(obj, name):
+    if not coroutines_supported:
+        return False
+    
+    cls = obj if isinstance(obj, type) else type(obj)
+    decisions = coroutine_methods.get(cls)
+    if decisions is None:
+        decisions = coroutine_methods.setdefault(cls, {})
+    
+    decision = decisions.get(name)
+    if decision is None:
+        decision = decisions[name] = find_coroutine_method(cls, name)
+    
+    return decision
+
+
+# inspect is only imported here, since it takes longer to import than the rest of the package.
+def find_coroutine_method(cls, name):
+    import inspect
+    
+    for klass in cls.__mro__:
+        attribute = klass.__dict__.get(name)
+        if attribute is not None:
+            return inspect.iscoroutinefunction(attribute)
     
-    return fake_caller
\ No newline at end of file
+    return False
+
+
+def reject_latency(name, latency):
+    if latency:
+        raise ValueError('Latency can only be simulated for coroutine methods, and %s is not one.' % name)
\ No newline at end of file
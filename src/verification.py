@@ -0,0 +1,184 @@
+# Standard modules
+import array
+
+# External modules
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Internal modules
+
+
+
+# A CallTable gathers the calls recorded for one patched method on each of a group of doubles. Gathering reads the
+# call count of every double into a column, so that questions about the counts are answered by one operation on that
+# column, which is a NumPy array when NumPy is available and an array from the standard library otherwise. The first
+# question about arguments gathers them as well, into a column for every distinct call holding the index of the double
+# which made it, once per time it was made. Counting the calls made with any arguments then only reads their column.
+class CallTable(object):
+    
+    def __init__(self, doubles, name):
+        self.doubles = list(doubles)
+        self.name = name
+        
+        # The recorders are looked up without checks, and looked up again one by one to report the first double
+        # without one.
+        try:
+            self.recorders = [getattr(double, name).recorder for double in self.doubles]
+        except AttributeError:
+            self.recorders = [self.retrieve_recorder(double) for double in self.doubles]
+        
+        self.call_counts = create_column([recorder.call_count for recorder in self.recorders])
+        self.call_index = None
+    
+    
+    def retrieve_recorder(self, double):
+        recorder = getattr(getattr(double, self.name, None), 'recorder', None)
+        if recorder is None:
+            raise ValueError('%s was not patched with a recorder on %r.' % (self.name, double))
+        
+        return recorder
+    
+    
+    def __len__(self):
+        return len(self.doubles)
+    
+    
+    # Returns the doubles whose method was never called.
+    def uncalled(self):
+        if numpy is not None:
+            return [self.doubles[index] for index in numpy.flatnonzero(self.call_counts == 0)]
+        
+        if 0 not in self.call_counts:
+            return []
+        
+        return [double for double, call_count in zip(self.doubles, self.call_counts) if call_count == 0]
+    
+    
+    # Returns, for every double, the number of calls made with the given arguments. This needs every call to have been
+    # retained, by recorders in ARGUMENTS or TIMESTAMPS mode whose capacity was never exceeded. See gather_arguments.
+    def count_matching(self, *method_args, **method_kwargs):
+        if self.call_index is None:
+            self.gather_arguments()
+        
+        owners = self.call_index.find((method_args, method_kwargs))
+        if owners is None:
+            return create_column([0]*len(self.doubles))
+        
+        if numpy is not None:
+            return numpy.bincount(owners, minlength = len(self.doubles))
+        
+        matching_counts = create_column([0]*len(self.doubles))
+        for owner in owners:
+            matching_counts[owner] += 1
+        
+        return matching_counts
+    
+    
+    # Since every call has been retained, the oldest call of every recorder is in its first slot, and its retained
+    # calls are its first call_count slots. Calls with hashable positional arguments only, by far the most common, are
+    # looked up inline.
+    def gather_arguments(self):
+        call_index = CallIndex()
+        positional_owners = call_index.positional_owners
+        for owner, recorder in enumerate(self.recorders):
+            slots = recorder.slots
+            call_count = recorder.call_count
+            if slots is None or call_count > recorder.capacity:
+                raise ValueError('The arguments of some calls to %s were not retained by their recorders.' % self.name)
+            
+            for call in slots[:call_count]:
+                if not call[1]:
+                    try:
+                        positional_owners[call[0]].append(owner)
+                        continue
+                    except (KeyError, TypeError):
+                        pass
+                
+                call_index.add(call, owner)
+        
+        call_index.freeze()
+        self.call_index = call_index
+    
+    
+    # Returns True if and only if every double was called exactly times times with the given arguments, and never with
+    # any others. The call counts are checked first, so that arguments are only compared when they all match.
+    def all_called_exactly(self, times, *method_args, **method_kwargs):
+        if numpy is not None:
+            if not numpy.all(self.call_counts == times):
+                return False
+        elif self.call_counts.count(times) != len(self.call_counts):
+            return False
+        
+        if times == 0:
+            return True
+        
+        matching_counts = self.count_matching(*method_args, **method_kwargs)
+        if numpy is not None:
+            return bool(numpy.all(matching_counts == times))
+        
+        return matching_counts.count(times) == len(matching_counts)
+
+
+
+# A CallIndex maps every distinct call, a pair of positional and keyword arguments, to the owners it was added with.
+# Calls with unhashable arguments are compared one by one with the ones added before them. Once frozen, the owners of
+# every call are a column.
+class CallIndex(object):
+    
+    def __init__(self):
+        self.positional_owners = {}
+        self.keyword_owners = {}
+        self.unhashable_owners = []
+    
+    
+    def find(self, call):
+        method_args, method_kwargs = call
+        try:
+            if method_kwargs:
+                return self.keyword_owners.get((method_args, frozenset(method_kwargs.items())))
+            
+            return self.positional_owners.get(method_args)
+        except TypeError:
+            for unhashable_call, owners in self.unhashable_owners:
+                if unhashable_call == call:
+                    return owners
+            
+            return None
+    
+    
+    def add(self, call, owner):
+        owners = self.find(call)
+        if owners is None:
+            owners = []
+            method_args, method_kwargs = call
+            try:
+                if method_kwargs:
+                    self.keyword_owners[(method_args, frozenset(method_kwargs.items()))] = owners
+                else:
+                    self.positional_owners[method_args] = owners
+            except TypeError:
+                self.unhashable_owners.append((call, owners))
+        
+        owners.append(owner)
+    
+    
+    def freeze(self):
+        for owners_by_call in (self.positional_owners, self.keyword_owners):
+            for key, owners in owners_by_call.items():
+                owners_by_call[key] = create_column(owners)
+        
+        self.unhashable_owners = [(call, create_column(owners)) for call, owners in self.unhashable_owners]
+
+
+
+def gather_calls(doubles, name):
+    return CallTable(doubles, name)
+
+
+def create_column(values):
+    if numpy is not None:
+        return numpy.array(values, numpy.int64)
+    
+    return array.array('l', values)
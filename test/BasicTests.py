@@ -5,9 +5,26 @@ import unittest
 import doppelganger
 
 # Standard modules
+import copy
+import functools
+import gc
 import inspect
+import itertools
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import weakref
 
 # External modules
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
 
 # Internal modules
 
@@ -15,6 +32,32 @@ import inspect
 
 # TEST CASES
 
+class PicklableClass(object):
+    member = 0
+    
+    def __init__(self):
+        self.instance_member = 1
+    
+    def method(self):
+        return 'lol'
+
+
+
+class PicklableSlottedClass(object):
+    __slots__ = ('slot', 'other_slot')
+    
+    def __init__(self):
+        self.slot = 1
+        self.other_slot = 2
+
+
+
+class FakePicklableSlottedClass(PicklableSlottedClass):
+    __metaclass__ = doppelganger.Doppel
+    __slots__ = ()
+
+
+
 class doppelgangerTest(unittest.TestCase):
     
     class TrueClass(object):
@@ -144,6 +187,1052 @@ class doppelgangerTest(unittest.TestCase):
         self.assertEqual(fake_object.method(first_argument, second_argument), true_value)
     
     
+    def test_attribute_plan_is_cached(self):
+        fake_class = self.make_fake_class()
+        fake_class()
+        attribute_plan = fake_class.attribute_plan
+        fake_class()
+        self.assertIs(fake_class.attribute_plan, attribute_plan)
+        self.assertIn('method', attribute_plan.names_to_clear)
+        self.assertIn('__class__', attribute_plan.names_to_keep)
+    
+    
+    def test_package_is_loaded_lazily(self):
+        statement = 'import sys, doppelganger; print(sorted(name for name, module in sys.modules.items() if name.startswith("doppelganger.") and module))'
+        self.assertEqual(subprocess.check_output([sys.executable, '-c', statement]).strip(), b'[]')
+        self.assertIs(doppelganger.doppel_of, doppelganger.factory.doppel_of)
+        self.assertIn('doppel_of', dir(doppelganger))
+    
+    
+    def test_doubles_only_carry_members_of_their_class(self):
+        fake_class = self.make_fake_class()
+        self.assertEqual(sorted(fake_class().__dict__), ['member', 'method'])
+        
+        fake_class.declare_touchable('__doppel_state__')
+        self.assertEqual(sorted(fake_class().__dict__), ['member', 'method'])
+    
+    
+    def test_attribute_plan_is_rebuilt_after_declarations(self):
+        fake_class = self.make_fake_class()
+        fake_class()
+        fake_class.declare_untouchable('method')
+        fake_object = fake_class()
+        self.assertNotIn('method', fake_class.attribute_plan.names_to_clear)
+        self.assertEqual(fake_object.method(), 'lol')
+    
+    
+    def test_attribute_plan_is_rebuilt_after_base_modification(self):
+        class BaseClass(object):
+            pass
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fake_class = fakeClass
+        fake_class()
+        BaseClass.added_member = 1
+        fake_object = fake_class()
+        self.assertIsNone(fake_object.added_member)
+        
+        del BaseClass.added_member
+        BaseClass.replacing_member = 2
+        fake_class.refresh_attribute_plan()
+        fake_object = fake_class()
+        self.assertIsNone(fake_object.replacing_member)
+    
+    
+    def test_attribute_plan_is_rebuilt_after_attribute_replacement(self):
+        calls = []
+        
+        class BaseClass(object):
+            def method(self):
+                return 'lol'
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass()
+        BaseClass.method = property(lambda self: calls.append('get'), lambda self, value: calls.append(('set', value)))
+        fakeClass.refresh_attribute_plan()
+        fake_object = fakeClass()
+        self.assertIsNone(fake_object.method)
+        self.assertEqual(calls, [])
+        
+        for lazy in (True, False):
+            fakeClass.declare_lazy(lazy)
+            fakeClass()
+            BaseClass.method = lambda self: 'lol'
+            fakeClass.refresh_attribute_plan()
+            self.assertIsNone(fakeClass().method)
+        
+        fake_object = fakeClass()
+        self.assertRaises(AttributeError, getattr, fake_object, 'added_member')
+        BaseClass.added_member = 1
+        self.assertIsNone(fakeClass().added_member)
+    
+    
+    def test_attribute_plan_is_kept_after_value_replacement(self):
+        class BaseClass(object):
+            count = 0
+            
+            def __init__(self):
+                BaseClass.count += 1
+            
+            @property
+            def read_only(self):
+                return 'lol'
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass()
+        attribute_plan = fakeClass.attribute_plan
+        fake_object = fakeClass()
+        self.assertIs(fakeClass.attribute_plan, attribute_plan)
+        self.assertIs(type(fake_object), attribute_plan.masking_class)
+        self.assertEqual(BaseClass.count, 2)
+    
+    
+    def test_attribute_plan_clears_instance_attributes(self):
+        class BaseClass(object):
+            def __init__(self):
+                self.instance_member = 1
+                self.kept_instance_member = 2
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass.declare_untouchable('kept_instance_member')
+        fake_object = fakeClass()
+        self.assertIsNone(fake_object.instance_member)
+        self.assertEqual(fake_object.kept_instance_member, 2)
+    
+    
+    def test_create_without_constructor(self):
+        class BaseClass(object):
+            member = 0
+            
+            def __init__(self):
+                raise RuntimeError('The constructor should not run.')
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fake_object = fakeClass.create_without_constructor()
+        self.assertIsInstance(fake_object, BaseClass)
+        self.assertIsNone(fake_object.member)
+        
+        fakeClass.declare_constructor_free()
+        fake_object = fakeClass()
+        self.assertIsNone(fake_object.member)
+    
+    
+    def test_create_without_constructor_uses_instance_attribute_layout(self):
+        class BaseClass(object):
+            def __init__(self):
+                self.observed_member = 1
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass.declare_instance_attribute('declared_member')
+        fakeClass()
+        fake_object = fakeClass.create_without_constructor()
+        self.assertIsNone(fake_object.observed_member)
+        self.assertIsNone(fake_object.declared_member)
+    
+    
+    def test_declarations_have_no_duplicates(self):
+        fake_class = self.make_fake_class()
+        attribute_names = ['__magic_attribute__']
+        fake_class.make_magic_attributes_untouchable_unless_explicitly_touchable(attribute_names)
+        fake_class.make_magic_attributes_untouchable_unless_explicitly_touchable(attribute_names)
+        fake_class.declare_untouchable('member')
+        fake_class.declare_untouchable('member')
+        self.assertEqual(sorted(fake_class.untouchable_attributes), ['__magic_attribute__', 'member'])
+    
+    
+    def test_declarations_are_inherited(self):
+        fake_class = self.make_fake_class()
+        fake_class.declare_untouchable('member')
+        
+        class fakeSubclass(fake_class):
+            pass
+        
+        self.assertIn('member', fakeSubclass.untouchable_attributes)
+        fake_object = fakeSubclass()
+        self.assertEqual(fake_object.member, 0)
+        self.assertIsNone(fake_object.method)
+        
+        fakeSubclass.declare_touchable('member')
+        self.assertIn('member', fake_class.untouchable_attributes)
+        self.assertIsNone(fakeSubclass().member)
+        
+        fake_class.declare_untouchable('method')
+        self.assertEqual(fakeSubclass().method(), 'lol')
+    
+    
+    def test_bookkeeping_does_not_hide_members(self):
+        class TrueClass(object):
+            deep = 'deep'
+            specs = 'specs'
+            
+            def lock(self):
+                return 'lol'
+        
+        class fakeClass(TrueClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        for name in ('lock', 'deep', 'specs'):
+            fakeClass.declare_untouchable(name)
+        
+        fake_object = fakeClass()
+        self.assertEqual(fake_object.lock(), 'lol')
+        self.assertEqual(fake_object.deep, 'deep')
+        self.assertEqual(fake_object.specs, 'specs')
+        
+        fakeClass.declare_touchable('lock')
+        fake_object = fakeClass()
+        self.assertIsNone(fake_object.lock)
+        self.assertFalse(hasattr(fake_object, 'thread_state'))
+    
+    
+    def test_shadowed_doubles(self):
+        class BaseClass(object):
+            member = 0
+            
+            def __init__(self, handle = 'bob'):
+                self.handle = handle
+                self.instance_member = 1
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass.declare_untouchable('handle')
+        fakeClass.declare_shadowed()
+        
+        fake_object = fakeClass()
+        self.assertIsInstance(fake_object, fakeClass)
+        self.assertEqual(fake_object.__dict__, {'handle': 'bob'})
+        self.assertIsNone(fake_object.member)
+        self.assertIsNone(fake_object.instance_member)
+        
+        fake_object = fakeClass.create_without_constructor()
+        self.assertEqual(fake_object.__dict__, {})
+        self.assertIsNone(fake_object.instance_member)
+        
+        doppelganger.tools.patch_returner(fake_object, 'member', 'rofl')
+        self.assertEqual(fake_object.member(), 'rofl')
+        self.assertIsNone(fakeClass.create_without_constructor().member)
+    
+    
+    def test_shadowed_doubles_with_slots(self):
+        class BaseClass(object):
+            __slots__ = ('slot',)
+            
+            def __init__(self):
+                self.slot = 1
+            
+            def method(self):
+                return 'lol'
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+            __slots__ = ()
+        
+        fakeClass.declare_shadowed()
+        fake_object = fakeClass()
+        self.assertFalse(hasattr(fake_object, '__dict__'))
+        self.assertIsNone(fake_object.slot)
+        self.assertIsNone(fake_object.method)
+        self.assertRaises(ValueError, doppelganger.take_snapshot, fake_object)
+    
+    
+    def test_doppel_of(self):
+        fake_class = doppelganger.doppel_of(self.TrueClass, untouchable = ['member'])
+        self.assertIs(doppelganger.doppel_of(self.TrueClass, untouchable = ('member',)), fake_class)
+        self.assertIsNot(doppelganger.doppel_of(self.TrueClass), fake_class)
+        
+        fake_object = fake_class()
+        self.assertIsInstance(fake_object, self.TrueClass)
+        self.assertEqual(fake_object.member, 0)
+        self.assertIsNone(fake_object.method)
+        
+        self.assertIs(doppelganger.doppel_of(dict), doppelganger.doppel_of(dict))
+    
+    
+    def test_doppel_of_cache_is_collected_with_class(self):
+        class BaseClass(object):
+            pass
+        
+        doppelganger.doppel_of(BaseClass)()
+        self.assertEqual(sorted(vars(BaseClass)), ['__dict__', '__doc__', '__module__', '__weakref__'])
+        base_class_reference = weakref.ref(BaseClass)
+        del BaseClass
+        gc.collect()
+        self.assertIsNone(base_class_reference())
+    
+    
+    def test_patch_returner_with_recorder(self):
+        fake_object = self.make_fake_object()
+        recorder = doppelganger.CallRecorder(capacity = 2)
+        doppelganger.tools.patch_returner(fake_object, 'method', 'rofl', recorder)
+        
+        self.assertIsNone(recorder.last_call())
+        for j in range(3):
+            fake_object.method(j, key = 'value')
+        
+        self.assertIs(fake_object.method.recorder, recorder)
+        self.assertEqual(recorder.call_count, 3)
+        self.assertEqual(recorder.last_call().args, (2,))
+        self.assertEqual([call.args for call in recorder.calls()], [(1,), (2,)])
+        self.assertEqual(len(recorder.calls_matching(1, key = 'value')), 1)
+        self.assertEqual(recorder.calls_matching(0, key = 'value'), [])
+    
+    
+    def test_create_fake_caller_with_recorder(self):
+        counting_recorder = doppelganger.CallRecorder(doppelganger.recording.COUNTS)
+        fake_caller = doppelganger.tools.create_fake_caller(lambda x: x + 1, counting_recorder)
+        self.assertEqual(fake_caller(None, 1), 2)
+        self.assertEqual(counting_recorder.call_count, 1)
+        self.assertRaises(ValueError, counting_recorder.last_call)
+        
+        timing_recorder = doppelganger.CallRecorder(doppelganger.recording.TIMESTAMPS)
+        fake_caller = doppelganger.tools.create_fake_caller(lambda x: x + 1, recorder = timing_recorder)
+        fake_caller(None, 1)
+        self.assertGreater(timing_recorder.last_call().timestamp, 0)
+    
+    
+    def test_lazy_doubles(self):
+        fake_class = self.make_fake_class()
+        fake_class.declare_untouchable('member')
+        fake_class.declare_lazy()
+        
+        fake_object = fake_class()
+        self.assertIsInstance(fake_object, self.TrueClass)
+        self.assertEqual(fake_class.retrieve_resolved_attributes(fake_object), [])
+        self.assertIsNone(fake_object.method)
+        self.assertEqual(fake_object.member, 0)
+        self.assertIsNone(fake_object.method)
+        self.assertEqual(fake_class.retrieve_resolved_attributes(fake_object), ['method'])
+        
+        with self.assertRaises(AttributeError):
+            getattr(fake_object, 'invalid_descriptor')
+        
+        doppelganger.tools.patch_returner(fake_object, 'method', 'rofl')
+        self.assertEqual(fake_object.method(), 'rofl')
+    
+    
+    def test_lazy_doubles_clear_instance_attributes(self):
+        class BaseClass(object):
+            def __init__(self):
+                self.instance_member = 1
+            
+            @property
+            def expensive_property(self):
+                raise RuntimeError('The property should not be evaluated.')
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass.declare_lazy()
+        self.assertIsNone(fakeClass().instance_member)
+        self.assertIsNone(fakeClass().expensive_property)
+        self.assertIsNone(fakeClass.create_without_constructor().instance_member)
+    
+    
+    def test_instrumentation(self):
+        instrumentation = doppelganger.instrumentation
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            fake_class = self.make_fake_class()
+            fake_object = fake_class()
+            fake_class.create_without_constructor()
+            doppelganger.tools.patch_returner(fake_object, 'method', 'rofl')
+        finally:
+            instrumentation.disable()
+        
+        fake_class()
+        
+        class_statistics = instrumentation.retrieve_statistics(fake_class)
+        self.assertEqual(class_statistics.instantiation_count, 2)
+        self.assertEqual(class_statistics.patch_count, 1)
+        self.assertGreater(class_statistics.enumeration_time, 0)
+        self.assertGreater(class_statistics.total_construction_time(), 0)
+        
+        summary = json.loads(instrumentation.report_json())[0]
+        self.assertEqual(summary['name'], instrumentation.qualified_name(fake_class))
+        self.assertIn(summary['name'], instrumentation.report_text())
+        instrumentation.reset()
+    
+    
+    def test_instrumentation_environment(self):
+        read_environment_format = doppelganger.instrumentation.read_environment_format
+        self.assertEqual([read_environment_format(value) for value in ('json', 'Text', '1', 'yes', '0', 'off', '')], ['json', 'text', 'text', 'text', None, None, None])
+        
+        report_path = os.path.join(tempfile.mkdtemp(), 'report.txt')
+        try:
+            environment = dict(os.environ, DOPPELGANGER_INSTRUMENTATION = '1', DOPPELGANGER_INSTRUMENTATION_PATH = report_path)
+            subprocess.check_call([sys.executable, '-c', 'import doppelganger; doppelganger.Doppel'], env = environment)
+            self.assertTrue(os.path.exists(report_path))
+        finally:
+            shutil.rmtree(os.path.dirname(report_path))
+    
+    
+    def test_patch_many(self):
+        fake_object = self.make_fake_object()
+        doppelganger.tools.patch_many(fake_object, {'method': 'rofl', 'member': lambda self, x: x + 1})
+        self.assertEqual(fake_object.method(), 'rofl')
+        self.assertEqual(fake_object.member(1), 2)
+    
+    
+    def test_patch_many_with_unbindable_callables(self):
+        fake_object = self.make_fake_object()
+        doppelganger.tools.patch_many(fake_object, {'method': {'key': 'rofl'}.get, 'member': dict})
+        self.assertEqual(fake_object.method('key'), 'rofl')
+        self.assertEqual(fake_object.member(key = 'lmao'), {'key': 'lmao'})
+        
+        doppelganger.tools.patch_many(fake_object, {'method': functools.partial(max, 1)})
+        self.assertEqual(fake_object.method(2), 2)
+        
+        function = lambda: 'lol'
+        doppelganger.tools.patch_many(fake_object, {'method': doppelganger.tools.ReturnValue(dict), 'member': doppelganger.tools.ReturnValue(function)})
+        self.assertIs(fake_object.method(), dict)
+        self.assertIs(fake_object.member(), function)
+        
+        fake_class = self.make_fake_class()
+        doppelganger.tools.patch_class_many(fake_class, {'method': dict, 'member': doppelganger.tools.ReturnValue(dict)})
+        self.assertEqual(fake_class().method(key = 'lmao'), {'key': 'lmao'})
+        self.assertIs(fake_class().member(), dict)
+    
+    
+    def test_patch_class(self):
+        fake_class = self.make_fake_class()
+        unpatched_object = fake_class()
+        doppelganger.tools.patch_class(fake_class, 'method', lambda self: 'rofl')
+        doppelganger.tools.patch_class_many(fake_class, {'member': 'lmao'})
+        
+        fake_object = fake_class()
+        self.assertNotIn('method', vars(fake_object))
+        self.assertEqual(fake_object.method(), 'rofl')
+        self.assertEqual(fake_object.member(), 'lmao')
+        self.assertIsNone(unpatched_object.method)
+        self.assertEqual(self.make_true_object().method(), 'lol')
+        
+        fake_class.declare_shadowed()
+        self.assertEqual(fake_class().method(), 'rofl')
+        
+        fake_class = self.make_fake_class()
+        fake_class.declare_registered()
+        fake_objects = [fake_class(), fake_class.create_without_constructor()]
+        doppelganger.tools.patch_class(fake_class, 'method', lambda self: 'rofl')
+        for fake_object in fake_objects:
+            self.assertEqual(fake_object.method(), 'rofl')
+    
+    
+    def test_overriding_declarations(self):
+        fake_class = self.make_fake_class()
+        with fake_class.overriding_declarations(untouchable = ['member']):
+            self.assertEqual(fake_class().member, 0)
+            with fake_class.overriding_declarations(untouchable = ['method']):
+                self.assertEqual(fake_class().method(), 'lol')
+            
+            self.assertIsNone(fake_class().method)
+        
+        self.assertIsNone(fake_class().member)
+        self.assertNotIn('member', fake_class.untouchable_attributes)
+    
+    
+    def test_overriding_declarations_reuses_plans(self):
+        fake_class = self.make_fake_class()
+        fake_class.declare_shadowed()
+        double_classes = set()
+        for i in range(3):
+            with fake_class.overriding_declarations(untouchable = ['member']):
+                fake_object = fake_class()
+                self.assertEqual(fake_object.member, 0)
+                double_classes.add(type(fake_object))
+        
+        self.assertEqual(len(double_classes), 1)
+        with fake_class.overriding_declarations(untouchable = ['method']):
+            self.assertIsNone(fake_class().member)
+    
+    
+    def test_concurrent_instantiation(self):
+        fake_class = self.make_fake_class()
+        failures = []
+        
+        def instantiate(untouchable):
+            with fake_class.overriding_declarations(untouchable = untouchable):
+                for j in range(200):
+                    fake_object = fake_class()
+                    if (fake_object.member is None) == ('member' in untouchable):
+                        failures.append(untouchable)
+                    fake_class.declare_touchable('method')
+        
+        threads = [threading.Thread(target = instantiate, args = (untouchable,)) for untouchable in ([], ['member'])*4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(failures, [])
+        self.assertIsNone(fake_class().member)
+    
+    
+    def test_concurrent_instantiation_without_constructor(self):
+        counter = itertools.count()
+        
+        class BaseClass(object):
+            member = 0
+            
+            def __init__(self):
+                setattr(self, 'instance_member_%d' % next(counter), 1)
+        
+        class fakeClass(BaseClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        errors = []
+        
+        def instantiate():
+            try:
+                for j in range(100):
+                    fakeClass()
+                    fakeClass.create_without_constructor()
+            except Exception as error:
+                errors.append(error)
+        
+        for lazy in (True, False):
+            fakeClass.declare_lazy(lazy)
+            threads = [threading.Thread(target = instantiate) for j in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            self.assertEqual(errors, [])
+            fake_object = fakeClass.create_without_constructor()
+            self.assertIsNone(fake_object.instance_member_0)
+            self.assertIsNone(fake_object.member)
+    
+    
+    def test_snapshot(self):
+        fake_object = self.make_fake_object()
+        recorder = doppelganger.CallRecorder(capacity = 4)
+        doppelganger.tools.patch_returner(fake_object, 'method', 'rofl', recorder)
+        fake_object.method(0)
+        
+        attributes = dict(vars(fake_object))
+        class_attributes = dict(vars(type(fake_object)))
+        snapshot = doppelganger.take_snapshot(fake_object)
+        self.assertIsInstance(fake_object, self.TrueClass)
+        self.assertEqual(vars(fake_object), attributes)
+        self.assertEqual(vars(type(fake_object).__bases__[0]), class_attributes)
+        doppelganger.tools.patch_returner(fake_object, 'member', 'lmao')
+        fake_object.added_member = 1
+        for j in range(1, 3):
+            fake_object.method(j)
+        
+        snapshot.restore()
+        self.assertIsNone(fake_object.member)
+        self.assertFalse(hasattr(fake_object, 'added_member'))
+        self.assertEqual(fake_object.method(), 'rofl')
+        self.assertEqual(recorder.call_count, 2)
+        self.assertEqual([call.args for call in recorder.calls()], [(0,), ()])
+    
+    
+    def test_double_pool(self):
+        fake_class = self.make_fake_class()
+        
+        def create_double():
+            fake_object = fake_class()
+            doppelganger.tools.patch_returner(fake_object, 'method', 'rofl')
+            return fake_object
+        
+        pool = doppelganger.DoublePool(create_double, size = 1)
+        fake_object = pool.acquire()
+        doppelganger.tools.patch_returner(fake_object, 'method', 'lmao')
+        pool.release(fake_object)
+        
+        self.assertRaises(ValueError, pool.release, fake_object)
+        self.assertRaises(ValueError, pool.release, fake_class())
+        
+        self.assertIs(pool.acquire(), fake_object)
+        self.assertEqual(fake_object.method(), 'rofl')
+        self.assertIsNot(pool.acquire(), fake_object)
+    
+    
+    def test_pickle_double(self):
+        class fakeClass(PicklableClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass.declare_untouchable('instance_member')
+        doppelganger.tools.patch_class(fakeClass, 'member', doppelganger.tools.create_fake_returner('lmao'))
+        fake_object = fakeClass()
+        recorder = doppelganger.CallRecorder()
+        doppelganger.tools.patch_returner(fake_object, 'method', 'rofl', recorder)
+        fake_object.method(1)
+        
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            unpickled_object = pickle.loads(pickle.dumps(fake_object, protocol))
+            self.assertIsInstance(unpickled_object, PicklableClass)
+            self.assertIn('instance_member', type(unpickled_object).untouchable_attributes)
+            self.assertEqual(unpickled_object.instance_member, 1)
+            self.assertEqual(unpickled_object.member(), 'lmao')
+            self.assertEqual(unpickled_object.method(2), 'rofl')
+            self.assertEqual([call.args for call in unpickled_object.method.recorder.calls()], [(1,), (2,)])
+        
+        unpickled_objects = pickle.loads(pickle.dumps([fake_object, fakeClass()]))
+        self.assertIs(type(unpickled_objects[0]), type(unpickled_objects[1]))
+    
+    
+    def test_pickle_shadowed_double(self):
+        fake_class = doppelganger.doppel_of(PicklableClass)
+        fake_class.declare_shadowed()
+        try:
+            unpickled_object = pickle.loads(pickle.dumps(fake_class()))
+            self.assertEqual(vars(unpickled_object), {})
+            self.assertIsNone(unpickled_object.method)
+            self.assertIsNone(unpickled_object.instance_member)
+        finally:
+            fake_class.declare_shadowed(False)
+    
+    
+    def test_pickle_shadowed_double_with_slots(self):
+        fake_class = FakePicklableSlottedClass
+        fake_class.declare_shadowed()
+        fake_class.declare_untouchable('slot')
+        try:
+            fake_object = fake_class()
+            for copied_object in (pickle.loads(pickle.dumps(fake_object, 2)), copy.copy(fake_object), copy.deepcopy(fake_object)):
+                self.assertFalse(hasattr(copied_object, '__dict__'))
+                self.assertEqual(copied_object.slot, 1)
+                self.assertIsNone(copied_object.other_slot)
+        finally:
+            fake_class.declare_touchable('slot')
+            fake_class.declare_shadowed(False)
+    
+    
+    def test_pickle_doubles_of_differently_patched_classes(self):
+        unpickled_objects = []
+        for value in ('A', 'B'):
+            class fakeClass(PicklableClass):
+                __metaclass__ = doppelganger.Doppel
+            
+            doppelganger.tools.patch_class(fakeClass, 'method', doppelganger.tools.create_fake_returner(value))
+            unpickled_objects.append(pickle.loads(pickle.dumps(fakeClass())))
+        
+        self.assertEqual([unpickled_object.method() for unpickled_object in unpickled_objects], ['A', 'B'])
+        
+        rebuilt_class = weakref.ref(type(unpickled_objects[0]))
+        del unpickled_objects[:]
+        gc.collect()
+        self.assertIsNone(rebuilt_class())
+    
+    
+    def test_copy_double(self):
+        fake_class = self.make_fake_class()
+        fake_class.declare_untouchable('member')
+        fake_class.declare_registered()
+        fake_object = fake_class()
+        fake_object.items = [1]
+        doppelganger.tools.patch_returner(fake_object, 'method', 'rofl')
+        
+        copied_object = copy.copy(fake_object)
+        deep_copied_object = copy.deepcopy(fake_object)
+        for other_object in (copied_object, deep_copied_object):
+            self.assertIs(type(other_object), fake_class)
+            self.assertEqual(other_object.member, 0)
+            self.assertEqual(other_object.method(), 'rofl')
+            self.assertIs(other_object.method.__self__, other_object)
+            self.assertIn(other_object, fake_class.retrieve_live_doubles())
+        
+        self.assertIs(copied_object.items, fake_object.items)
+        self.assertEqual(deep_copied_object.items, [1])
+        self.assertIsNot(deep_copied_object.items, fake_object.items)
+        
+        fake_class.declare_touchable('member')
+        self.assertIsNone(fake_class().member)
+    
+    
+    def test_strict_fakes(self):
+        class TrueClass(PicklableClass):
+            def method(self, first, second = None, *rest):
+                return 'lol'
+            
+            @staticmethod
+            def function(first):
+                return 'lol'
+        
+        class fakeClass(TrueClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fake_object = fakeClass()
+        recorder = doppelganger.CallRecorder()
+        doppelganger.tools.patch_returner(fake_object, 'method', 'rofl', recorder, strict = True)
+        doppelganger.tools.patch_caller(fake_object, 'function', lambda first: first, strict = True)
+        
+        self.assertEqual(fake_object.method(1), 'rofl')
+        self.assertEqual(fake_object.method(1, second = 2), 'rofl')
+        self.assertEqual(fake_object.method(1, 2, 3, 4), 'rofl')
+        self.assertRaises(TypeError, fake_object.method)
+        self.assertRaises(TypeError, fake_object.method, 1, third = 3)
+        self.assertEqual(recorder.call_count, 3)
+        self.assertEqual(fake_object.function('rofl'), 'rofl')
+        self.assertRaises(TypeError, fake_object.function, 1, 2)
+        
+        signature_checker = doppelganger.signatures.retrieve_signature_checker(fake_object, 'method')
+        self.assertIs(doppelganger.signatures.retrieve_signature_checker(fakeClass, 'method'), signature_checker)
+        self.assertRaises(ValueError, doppelganger.tools.patch_returner, fake_object, 'missing', 'rofl', strict = True)
+        
+        doppelganger.tools.patch_class(fakeClass, 'method', doppelganger.tools.create_fake_returner(1))
+        doppelganger.tools.patch_returner(fake_object, 'method', 2, strict = True)
+        self.assertRaises(TypeError, fake_object.method, 1, 2, 3, z = 4)
+    
+    
+    def test_patch_dispatcher(self):
+        fake_object = self.make_fake_object()
+        
+        doppelganger.tools.patch_dispatcher(fake_object, 'method', {(1,): 'rofl', (1, 2): 'lmao'}, default = 'lol')
+        self.assertEqual(fake_object.method(1), 'rofl')
+        self.assertEqual(fake_object.method(1, 2), 'lmao')
+        self.assertEqual(fake_object.method(2), 'lol')
+        self.assertEqual(fake_object.method([1]), 'lol')
+        self.assertRaises(TypeError, fake_object.method, 1, second = 2)
+        
+        doppelganger.tools.patch_dispatcher(fake_object, 'method', [('a', 'rofl')], key = lambda row, column = None: row)
+        self.assertEqual(fake_object.method('a', column = 0), 'rofl')
+        self.assertRaises(KeyError, fake_object.method, 'b')
+        self.assertRaises(TypeError, fake_object.method, ['a'])
+    
+    
+    def test_patch_sequence(self):
+        fake_object = self.make_fake_object()
+        values = iter(['rofl', 'lmao'])
+        
+        doppelganger.tools.patch_sequence(fake_object, 'method', values)
+        self.assertEqual(fake_object.method(1), 'rofl')
+        self.assertEqual(list(values), ['lmao'])
+        self.assertRaises(IndexError, fake_object.method)
+        
+        doppelganger.tools.patch_sequence(fake_object, 'method', (value for value in ['rofl']), default = None)
+        self.assertEqual(fake_object.method(), 'rofl')
+        self.assertIsNone(fake_object.method())
+    
+    
+    def test_cassette(self):
+        constructions = []
+        
+        class TrueClass(object):
+            def __init__(self):
+                constructions.append(self)
+                self.calls = 0
+            
+            def method(self, argument, keyword = None):
+                self.calls += 1
+                if argument is None:
+                    raise ValueError(keyword)
+                
+                return (argument, keyword, self.calls)
+        
+        cassette_file, cassette_path = tempfile.mkstemp()
+        os.close(cassette_file)
+        try:
+            with doppelganger.record_cassette(TrueClass(), cassette_path) as proxy:
+                self.assertEqual(proxy.method(1), (1, None, 1))
+                self.assertEqual(proxy.method(1), (1, None, 2))
+                self.assertEqual(proxy.method('a', keyword = 'b'), ('a', 'b', 3))
+                self.assertRaises(ValueError, proxy.method, None, 'lol')
+                self.assertEqual(proxy.calls, 4)
+            
+            with doppelganger.replay_cassette(cassette_path, TrueClass) as fake_object:
+                self.assertIsInstance(type(fake_object), doppelganger.Doppel)
+                self.assertEqual(len(constructions), 1)
+                self.assertEqual(fake_object.method('a', keyword = 'b'), ('a', 'b', 3))
+                self.assertEqual(fake_object.method(1), (1, None, 1))
+                self.assertEqual(fake_object.method(1), (1, None, 2))
+                self.assertEqual(fake_object.method(1), (1, None, 2))
+                self.assertRaises(ValueError, fake_object.method, None, 'lol')
+                self.assertRaises(KeyError, fake_object.method, 2)
+            
+            self.assertRaises(ValueError, fake_object.method, 1)
+            
+            fake_object = doppelganger.doppel_of(TrueClass)()
+            replay = doppelganger.replay_cassette(cassette_path, fake_object)
+            self.assertIs(replay.double, fake_object)
+            self.assertEqual(fake_object.method(1), (1, None, 1))
+            replay.close()
+        finally:
+            os.remove(cassette_path)
+    
+    
+    def test_streaming_call_log(self):
+        batches = []
+        for sink_class in (doppelganger.streaming.JSONLinesSink, doppelganger.streaming.BinarySink):
+            log_file, log_path = tempfile.mkstemp()
+            os.close(log_file)
+            try:
+                fake_object = self.make_fake_object()
+                with sink_class(log_path, buffer_size = 2) as sink:
+                    recorder = doppelganger.CallRecorder(doppelganger.recording.COUNTS, sink = sink)
+                    doppelganger.tools.patch_returner(fake_object, 'method', 'rofl', recorder)
+                    fake_object.method(1)
+                    fake_object.method(2, keyword = 'lol')
+                    fake_object.method(3)
+                    self.assertEqual(len(list(doppelganger.streaming.read_call_log(log_path))), 2)
+                
+                calls = doppelganger.streaming.read_call_log(log_path)
+                self.assertEqual([(call.args, call.kwargs) for call in calls], [((1,), {}), ((2,), {'keyword': 'lol'}), ((3,), {})])
+                self.assertEqual(recorder.call_count, 3)
+            finally:
+                os.remove(log_path)
+        
+        recorder = doppelganger.CallRecorder(doppelganger.recording.TIMESTAMPS, sink = doppelganger.streaming.CallbackSink(batches.append, 1))
+        recorder.record((1,), {})
+        self.assertEqual(batches, [[recorder.last_call()]])
+    
+    
+    def test_gather_calls(self):
+        fake_class = self.make_fake_class()
+        fake_objects = [fake_class() for j in range(10)]
+        for fake_object in fake_objects:
+            doppelganger.tools.patch_returner(fake_object, 'method', 'rofl', doppelganger.CallRecorder())
+        
+        for fake_object in fake_objects[1:]:
+            fake_object.method('lol')
+        
+        call_table = doppelganger.gather_calls(fake_objects, 'method')
+        self.assertEqual(call_table.uncalled(), fake_objects[:1])
+        self.assertEqual(list(call_table.count_matching('lol')), [0] + [1]*9)
+        self.assertFalse(call_table.all_called_exactly(1, 'lol'))
+        
+        fake_objects[0].method('lol')
+        self.assertTrue(doppelganger.gather_calls(fake_objects, 'method').all_called_exactly(1, 'lol'))
+        fake_objects[0].method('lmao')
+        call_table = doppelganger.gather_calls(fake_objects, 'method')
+        self.assertFalse(call_table.all_called_exactly(1, 'lol'))
+        self.assertEqual(list(call_table.count_matching(['unhashable'])), [0]*10)
+        self.assertEqual(list(call_table.count_matching('lol', key = 1)), [0]*10)
+        
+        fake_objects[1].method(['unhashable'])
+        fake_objects[2].method('lol', key = 1)
+        fake_objects[2].method('lol', key = 1)
+        call_table = doppelganger.gather_calls(fake_objects, 'method')
+        self.assertEqual(list(call_table.count_matching(['unhashable'])), [0, 1] + [0]*8)
+        self.assertEqual(list(call_table.count_matching('lol', key = 1)), [0, 0, 2] + [0]*7)
+        self.assertEqual(list(call_table.count_matching('lol')), [1]*10)
+        self.assertEqual(list(call_table.count_matching('lmao')), [1] + [0]*9)
+        
+        self.assertRaises(ValueError, doppelganger.gather_calls, [fake_class()], 'method')
+        
+        fake_object = fake_class()
+        doppelganger.tools.patch_returner(fake_object, 'method', None, doppelganger.CallRecorder(doppelganger.recording.COUNTS))
+        fake_object.method('lol')
+        call_table = doppelganger.gather_calls([fake_object], 'method')
+        self.assertEqual(call_table.uncalled(), [])
+        self.assertFalse(call_table.all_called_exactly(2, 'lol'))
+        self.assertRaises(ValueError, call_table.count_matching, 'lol')
+    
+    
+    def test_properties_are_never_evaluated(self):
+        evaluations = []
+        
+        class TrueClass(object):
+            __slots__ = ('slot', '__dict__')
+            member = 0
+            
+            def __init__(self):
+                self.slot = 1
+                self.instance_member = 2
+            
+            @property
+            def read_only(self):
+                evaluations.append('read_only')
+                return 'lol'
+            
+            def get_read_write(self):
+                evaluations.append('read_write')
+                return 'lol'
+            
+            def set_read_write(self, value):
+                evaluations.append('read_write')
+            
+            read_write = property(get_read_write, set_read_write)
+            
+            def __getattr__(self, name):
+                evaluations.append(name)
+                return 'lol'
+        
+        class fakeClass(TrueClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        self.assertEqual(doppelganger.enumeration.enumerate_members(TrueClass()), dict(doppelganger.enumeration.enumerate_class_members(TrueClass), instance_member = 'data'))
+        self.assertEqual(doppelganger.enumeration.enumerate_class_members(TrueClass)['read_only'], 'property')
+        self.assertEqual(doppelganger.enumeration.enumerate_class_members(TrueClass)['slot'], 'slot')
+        self.assertEqual(doppelganger.enumeration.enumerate_class_members(TrueClass)['member'], 'data')
+        self.assertEqual(doppelganger.enumeration.enumerate_class_members(TrueClass)['get_read_write'], 'method')
+        
+        fake_objects = [fakeClass(), fakeClass.create_without_constructor()]
+        fakeClass.declare_shadowed()
+        fake_objects.append(fakeClass())
+        fakeClass.declare_shadowed(False)
+        for fake_object in fake_objects:
+            self.assertIsInstance(fake_object, fakeClass)
+            for name in ('member', 'slot', 'read_only', 'read_write', 'get_read_write'):
+                self.assertIsNone(getattr(fake_object, name))
+        
+        fakeClass.declare_untouchable('read_only')
+        fake_object = fakeClass()
+        self.assertIsNone(fake_object.read_write)
+        self.assertEqual(evaluations, [])
+        self.assertEqual(fake_object.read_only, 'lol')
+        self.assertEqual(evaluations, ['read_only'])
+    
+    
+    def test_deep_doubles(self):
+        class Session(object):
+            def query(self, statement):
+                return 'lol'
+        
+        class Client(object):
+            session = Session()
+        
+        class Node(object):
+            pass
+        
+        class TrueClass(object):
+            def __init__(self):
+                self.client = Client()
+        
+        class fakeClass(TrueClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        fakeClass.declare_deep()
+        fakeClass.declare_spec('client', Client)
+        fakeClass.declare_spec('node', Node)
+        doppelganger.doppel_of(Client, deep = True).declare_spec('session', Session)
+        doppelganger.doppel_of(Node, deep = True).declare_spec('next', Node)
+        
+        fake_object = fakeClass()
+        self.assertIsInstance(fake_object, fakeClass)
+        self.assertNotIn('client', vars(fake_object))
+        self.assertIsInstance(fake_object.client, Client)
+        self.assertIs(fake_object.client, fake_object.client)
+        self.assertIsNot(fakeClass().client, fake_object.client)
+        self.assertIs(type(fakeClass().client), type(fake_object.client))
+        self.assertIsInstance(fake_object.client.session, Session)
+        self.assertIsNone(fake_object.client.session.query)
+        
+        doppelganger.tools.patch_returner(fake_object.client.session, 'query', 'rofl')
+        self.assertEqual(fake_object.client.session.query('lol'), 'rofl')
+        self.assertIsInstance(fake_object.node.next.next.next, Node)
+        
+        for mode in ('declare_shadowed', 'declare_lazy'):
+            getattr(fakeClass, mode)()
+            try:
+                self.assertIsInstance(fakeClass().client.session, Session)
+                self.assertIsInstance(fakeClass.create_without_constructor().node.next, Node)
+            finally:
+                getattr(fakeClass, mode)(False)
+        
+        fakeClass.declare_untouchable('client')
+        self.assertIs(type(fakeClass().client), Client)
+        
+        unpickled_object = pickle.loads(pickle.dumps(doppelganger.doppel_of(PicklableClass, deep = True)(), 2))
+        self.assertTrue(type(unpickled_object).deep)
+    
+    
+    def test_doppel_module(self):
+        package_path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(package_path, 'doubledpackage'))
+        with open(os.path.join(package_path, 'doubledpackage', '__init__.py'), 'w') as package_file:
+            package_file.write('from os import path\nclass Parent(object):\n    member = 0\nclass Child(Parent):\n    pass\n')
+        with open(os.path.join(package_path, 'doubledpackage', 'submodule.py'), 'w') as submodule_file:
+            submodule_file.write('class Other(object):\n    def method(self):\n        return 0\n')
+        
+        sys.path.insert(0, package_path)
+        try:
+            package = __import__('doubledpackage')
+            namespace = doppelganger.doppel_module(package, lazy = ['Child'], untouchable = ['member'])
+            
+            self.assertEqual(dir(namespace), ['Child', 'Parent', 'submodule'])
+            self.assertIn('Parent', vars(namespace))
+            self.assertNotIn('Child', vars(namespace))
+            self.assertIs(namespace.Parent, doppelganger.doppel_of(package.Parent, ['member']))
+            self.assertEqual(namespace.Child().member, 0)
+            self.assertIn('Child', vars(namespace))
+            self.assertNotIn('doubledpackage.submodule', sys.modules)
+            self.assertIsNone(namespace.submodule.Other().method)
+            self.assertRaises(AttributeError, getattr, namespace, 'path')
+        finally:
+            sys.path.remove(package_path)
+            sys.modules.pop('doubledpackage', None)
+            sys.modules.pop('doubledpackage.submodule', None)
+            shutil.rmtree(package_path)
+    
+    
+    def test_live_double_registry(self):
+        class TrueClass(self.TrueClass):
+            def __init__(self):
+                self.instance_member = 1
+            
+            @property
+            def read_only(self):
+                return 'lol'
+        
+        class fakeClass(TrueClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        self.assertRaises(ValueError, fakeClass.declare_untouchable, 'method', True)
+        self.assertIsNone(fakeClass().method)
+        fakeClass.declare_registered()
+        fake_objects = [fakeClass(), fakeClass.create_without_constructor()]
+        fakeClass.declare_shadowed()
+        fake_objects.append(fakeClass())
+        fakeClass.declare_shadowed(False)
+        
+        self.assertEqual(len(fakeClass.retrieve_live_doubles()), 3)
+        rows = [row for row in doppelganger.registry.report() if row['class'].endswith('.fakeClass')]
+        self.assertEqual(rows[0]['live'], 3)
+        self.assertGreater(rows[0]['bytes'], 0)
+        
+        for name in ('method', 'member', 'read_only'):
+            fakeClass.declare_untouchable(name, propagate = True)
+        
+        for fake_object in fake_objects:
+            self.assertEqual(fake_object.method(), 'lol')
+            self.assertEqual(fake_object.member, 0)
+            self.assertEqual(fake_object.read_only, 'lol')
+            self.assertIsNone(fake_object.instance_member)
+        
+        fakeClass.declare_touchable('read_only', propagate = True)
+        fakeClass.declare_touchable('method', propagate = True)
+        for fake_object in fake_objects:
+            self.assertIsNone(fake_object.method)
+            self.assertIsNone(fake_object.read_only)
+            self.assertEqual(fake_object.member, 0)
+        
+        del fake_objects[:], fake_object
+        gc.collect()
+        self.assertEqual(fakeClass.retrieve_live_doubles(), [])
+    
+    
+    def test_propagation_reaches_registered_subclasses(self):
+        class fakeClass(self.TrueClass):
+            __metaclass__ = doppelganger.Doppel
+        
+        class fakeSubclass(fakeClass):
+            pass
+        
+        fakeClass.declare_registered()
+        fakeSubclass.declare_registered()
+        fake_objects = [fakeClass(), fakeSubclass()]
+        fakeClass.declare_untouchable('method', propagate = True)
+        for fake_object in fake_objects:
+            self.assertEqual(fake_object.method(), 'lol')
+    
+    
     def make_true_object(self):
         true_object = self.TrueClass()
         return true_object
@@ -176,10 +1265,61 @@ class doppelgangerTest(unittest.TestCase):
 
 
 
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class asyncTest(unittest.TestCase):
+    
+    def setUp(self):
+        namespace = {}
+        exec('class TrueClass(object):\n    async def fetch(self, key):\n        return key\n    def method(self):\n        return "lol"', namespace)
+        self.fake_class = doppelganger.Doppel('fakeClass', (namespace['TrueClass'],), {})
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+    
+    
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+    
+    
+    def test_patch_returner_on_coroutine_method(self):
+        fake_object = self.fake_class()
+        recorder = doppelganger.CallRecorder()
+        doppelganger.tools.patch_returner(fake_object, 'fetch', 'rofl', recorder, latency = 0.001)
+        self.assertEqual(self.loop.run_until_complete(fake_object.fetch('key')), 'rofl')
+        self.assertEqual(recorder.last_call().args, ('key',))
+    
+    
+    def test_patch_caller_on_coroutine_method(self):
+        fake_objects = [self.fake_class() for j in range(100)]
+        for fake_object in fake_objects:
+            doppelganger.tools.patch_caller(fake_object, 'fetch', lambda key: key + 1, latency = 0.01)
+        
+        results = self.loop.run_until_complete(asyncio.gather(*[fake_object.fetch(1) for fake_object in fake_objects]))
+        self.assertEqual(results, [2]*100)
+    
+    
+    def test_patch_many_on_coroutine_method(self):
+        fake_object = self.fake_class()
+        doppelganger.tools.patch_many(fake_object, {'fetch': 'rofl', 'method': 'lmao'})
+        self.assertEqual(self.loop.run_until_complete(fake_object.fetch('key')), 'rofl')
+        self.assertEqual(fake_object.method(), 'lmao')
+    
+    
+    def test_coroutine_methods_are_decided_once(self):
+        fake_object = self.fake_class()
+        doppelganger.tools.patch_returner(fake_object, 'fetch', 'rofl')
+        doppelganger.tools.patch_returner(fake_object, 'method', 'lmao')
+        self.assertEqual(doppelganger.tools.coroutine_methods[self.fake_class], {'fetch': True, 'method': False})
+    
+    
+    def test_latency_is_rejected_for_plain_methods(self):
+        fake_object = self.fake_class()
+        self.assertRaises(ValueError, doppelganger.tools.patch_returner, fake_object, 'method', 'rofl', latency = 1)
+
 # TEST SUITE
 
 if __name__ == '__main__':
-    cases = (doppelgangerTest,)
+    cases = (doppelgangerTest, asyncTest)
     
     suite = unittest.TestSuite()
     